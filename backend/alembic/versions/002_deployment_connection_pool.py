@@ -0,0 +1,29 @@
+"""Deployment upstream connection pool settings
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('pool_max_connections', sa.Integer(), nullable=True, server_default='100'))
+    op.add_column('deployments', sa.Column('pool_max_keepalive', sa.Integer(), nullable=True, server_default='20'))
+    op.add_column('deployments', sa.Column('request_timeout_seconds', sa.Float(), nullable=True, server_default='30'))
+    op.add_column('deployments', sa.Column('http2', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'http2')
+    op.drop_column('deployments', 'request_timeout_seconds')
+    op.drop_column('deployments', 'pool_max_keepalive')
+    op.drop_column('deployments', 'pool_max_connections')
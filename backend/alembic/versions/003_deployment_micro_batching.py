@@ -0,0 +1,27 @@
+"""Deployment micro-batching settings
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('batching_enabled', sa.Boolean(), nullable=True, server_default=sa.false()))
+    op.add_column('deployments', sa.Column('max_batch_size', sa.Integer(), nullable=True, server_default='32'))
+    op.add_column('deployments', sa.Column('max_batch_wait_ms', sa.Float(), nullable=True, server_default='5'))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'max_batch_wait_ms')
+    op.drop_column('deployments', 'max_batch_size')
+    op.drop_column('deployments', 'batching_enabled')
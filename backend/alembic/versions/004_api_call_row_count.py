@@ -0,0 +1,23 @@
+"""API call row count for batch predictions
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('api_calls', sa.Column('row_count', sa.Integer(), nullable=True, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('api_calls', 'row_count')
@@ -0,0 +1,33 @@
+"""Prediction cache settings and model versions
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('models', sa.Column('version', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('deployments', sa.Column('cache_enabled', sa.Boolean(), nullable=True, server_default=sa.false()))
+    op.add_column('deployments', sa.Column('cache_backend', sa.String(), nullable=True, server_default='memory'))
+    op.add_column('deployments', sa.Column('cache_ttl_seconds', sa.Integer(), nullable=True, server_default='300'))
+    op.add_column('deployments', sa.Column('cache_max_entries', sa.Integer(), nullable=True, server_default='10000'))
+    op.add_column('deployments', sa.Column('cache_max_bytes', sa.Integer(), nullable=True, server_default=str(64 * 1024 * 1024)))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'cache_max_bytes')
+    op.drop_column('deployments', 'cache_max_entries')
+    op.drop_column('deployments', 'cache_ttl_seconds')
+    op.drop_column('deployments', 'cache_backend')
+    op.drop_column('deployments', 'cache_enabled')
+    op.drop_column('models', 'version')
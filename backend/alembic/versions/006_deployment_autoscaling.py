@@ -0,0 +1,54 @@
+"""Deployment autoscaling state and scaling audit log
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('replicas', sa.Integer(), nullable=True, server_default='1'))
+    op.add_column('deployments', sa.Column('target_concurrency', sa.Float(), nullable=True, server_default='4'))
+    op.add_column('deployments', sa.Column('target_p95_ms', sa.Float(), nullable=True))
+    op.add_column('deployments', sa.Column('last_scaled_at', sa.DateTime(), nullable=True))
+
+    # Create scaling_events table
+    op.create_table('scaling_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('deployment_id', sa.Integer(), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('previous_replicas', sa.Integer(), nullable=True),
+        sa.Column('new_replicas', sa.Integer(), nullable=True),
+        sa.Column('trigger', sa.String(), nullable=True),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.Column('request_rate', sa.Float(), nullable=True),
+        sa.Column('concurrency', sa.Float(), nullable=True),
+        sa.Column('p95_latency_ms', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['deployment_id'], ['deployments.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scaling_events_id'), 'scaling_events', ['id'], unique=False)
+    op.create_index(op.f('ix_scaling_events_deployment_id'), 'scaling_events', ['deployment_id'], unique=False)
+
+    # The autoscaler scans recent api_calls every few seconds
+    op.create_index('ix_api_calls_timestamp', 'api_calls', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_api_calls_timestamp', table_name='api_calls')
+    op.drop_index(op.f('ix_scaling_events_deployment_id'), table_name='scaling_events')
+    op.drop_index(op.f('ix_scaling_events_id'), table_name='scaling_events')
+    op.drop_table('scaling_events')
+    op.drop_column('deployments', 'last_scaled_at')
+    op.drop_column('deployments', 'target_p95_ms')
+    op.drop_column('deployments', 'target_concurrency')
+    op.drop_column('deployments', 'replicas')
@@ -0,0 +1,28 @@
+"""Deployment pipeline stage tracking
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Deployments that exist already went through the old inline deploy
+    op.add_column('deployments', sa.Column('stage', sa.String(), nullable=True, server_default='ready'))
+    op.add_column('deployments', sa.Column('stage_message', sa.Text(), nullable=True))
+    op.add_column('deployments', sa.Column('stage_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'stage_updated_at')
+    op.drop_column('deployments', 'stage_message')
+    op.drop_column('deployments', 'stage')
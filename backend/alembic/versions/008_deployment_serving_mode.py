@@ -0,0 +1,23 @@
+"""Deployment serving mode for the shared multi-model pool
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('serving_mode', sa.String(), nullable=True, server_default='dedicated'))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'serving_mode')
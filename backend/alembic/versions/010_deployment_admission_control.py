@@ -0,0 +1,27 @@
+"""Per-deployment admission control limits
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('max_concurrency', sa.Integer(), nullable=True, server_default='32'))
+    op.add_column('deployments', sa.Column('max_queue', sa.Integer(), nullable=True, server_default='64'))
+    op.add_column('deployments', sa.Column('queue_timeout_ms', sa.Integer(), nullable=True, server_default='2000'))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'queue_timeout_ms')
+    op.drop_column('deployments', 'max_queue')
+    op.drop_column('deployments', 'max_concurrency')
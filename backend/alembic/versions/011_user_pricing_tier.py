@@ -0,0 +1,23 @@
+"""Pricing tier per user for rate limits
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('pricing_tier', sa.String(), nullable=True, server_default='free'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'pricing_tier')
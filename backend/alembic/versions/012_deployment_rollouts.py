@@ -0,0 +1,34 @@
+"""Canary and shadow rollouts between deployments
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('rollout_mode', sa.String(), nullable=True))
+    op.add_column('deployments', sa.Column('candidate_deployment_id', sa.Integer(), nullable=True))
+    op.add_column('deployments', sa.Column('candidate_weight', sa.Float(), nullable=True, server_default='0'))
+    op.create_foreign_key(
+        'fk_deployments_candidate_deployment_id',
+        'deployments', 'deployments',
+        ['candidate_deployment_id'], ['id'],
+        ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_deployments_candidate_deployment_id', 'deployments', type_='foreignkey')
+    op.drop_column('deployments', 'candidate_weight')
+    op.drop_column('deployments', 'candidate_deployment_id')
+    op.drop_column('deployments', 'rollout_mode')
@@ -0,0 +1,23 @@
+"""Hedged predict requests
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('deployments', sa.Column('hedging_enabled', sa.Boolean(), nullable=True, server_default=sa.false()))
+
+
+def downgrade() -> None:
+    op.drop_column('deployments', 'hedging_enabled')
@@ -23,6 +23,7 @@ celery_app.conf.update(
     task_routes={
         "app.tasks.cleanup_stopped_notebooks": {"queue": "cleanup"},
         "app.tasks.calculate_usage_costs": {"queue": "billing"},
+        "app.tasks.deploy_model_async": {"queue": "deployments"},
     },
 )
 
@@ -36,4 +37,9 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.calculate_usage_costs",
         "schedule": 3600.0,  # Run every hour
     },
+    "autoscale-deployments": {
+        "task": "app.tasks.autoscale_deployments",
+        "schedule": 15.0,  # Run every 15 seconds
+        "options": {"expires": 15},  # Skip stale runs rather than piling them up
+    },
 }
\ No newline at end of file
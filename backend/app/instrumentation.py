@@ -0,0 +1,143 @@
+import os
+import time
+from typing import Iterator
+from urllib.parse import urlsplit
+
+import docker
+from fastapi import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from app.metrics import (
+    DOCKER_API_ERRORS,
+    DOCKER_API_SECONDS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    PREDICT_STAGE_SECONDS,
+)
+
+# Bound once so the predict path skips the label lookup
+PREDICT_STAGES = {stage: PREDICT_STAGE_SECONDS.labels(stage) for stage in ("auth", "rate_limit", "parse", "upstream", "log")}
+
+class StageTimer:
+    """Records the time since the previous mark against each predict stage"""
+
+    __slots__ = ("last",)
+
+    def __init__(self):
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        PREDICT_STAGES[stage].observe(now - self.last)
+        self.last = now
+
+class MetricsMiddleware:
+    """Request count and latency per route template.
+
+    Latency runs until the response starts, so streaming responses are
+    measured to their first byte rather than to the end of the stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_and_record(message):
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                self._observe(scope, status, time.perf_counter() - started)
+                started = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            if started is not None:
+                # Failed before a response was sent
+                self._observe(scope, status, time.perf_counter() - started)
+
+    def _observe(self, scope, status: int, seconds: float):
+        route = scope.get("route")
+        # Unmatched paths are lumped together to keep label cardinality bounded
+        template = getattr(route, "path", "unmatched")
+        HTTP_REQUESTS.labels(scope["method"], template, str(status)).inc()
+        HTTP_REQUEST_DURATION.labels(scope["method"], template).observe(seconds)
+
+# Trailing path segments that name an action rather than an object
+DOCKER_ACTIONS = {
+    "archive", "attach", "create", "exec", "history", "json", "kill", "logs", "pause", "prune",
+    "push", "resize", "restart", "start", "stats", "stop", "tag", "top", "unpause", "update", "wait"
+}
+
+def docker_operation(method: str, url: str) -> str:
+    """Collapse a Docker API URL into a low-cardinality operation name, e.g. POST /containers/{id}/start"""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if parts and parts[0].startswith("v1."):
+        parts = parts[1:]
+    if len(parts) <= 1:
+        return f"{method} /{'/'.join(parts)}"
+    if len(parts) == 2:
+        return f"{method} /{parts[0]}/{parts[1] if parts[1] in DOCKER_ACTIONS else '{id}'}"
+    # Image names may contain slashes, so everything between resource and action is the id
+    if parts[-1] in DOCKER_ACTIONS:
+        return f"{method} /{parts[0]}/{{id}}/{parts[-1]}"
+    return f"{method} /{parts[0]}/{{id}}"
+
+def instrument_docker_client(client: docker.DockerClient) -> docker.DockerClient:
+    """Time every Engine API call made through a docker-py client"""
+    def record(response, *args, **kwargs):
+        operation = docker_operation(response.request.method, response.request.url)
+        DOCKER_API_SECONDS.labels(operation).observe(response.elapsed.total_seconds())
+        if response.status_code >= 400:
+            DOCKER_API_ERRORS.labels(operation).inc()
+
+    client.api.hooks["response"].append(record)
+    return client
+
+class CeleryQueueCollector:
+    """Celery queue depth read from the Redis broker at scrape time"""
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # Lets the registry check names without reading the broker
+        yield GaugeMetricFamily("celery_queue_depth", "Tasks waiting in each Celery queue", labels=["queue"])
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        # Imported here so the gateway doesn't load Celery just to define metrics
+        from app.celery_app import celery_app
+        from app.redis_client import get_redis
+
+        queues = {celery_app.conf.task_default_queue}
+        queues.update(route["queue"] for route in celery_app.conf.task_routes.values())
+
+        family = GaugeMetricFamily("celery_queue_depth", "Tasks waiting in each Celery queue", labels=["queue"])
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for queue in sorted(queues):
+                pipe.llen(queue)
+            for queue, depth in zip(sorted(queues), pipe.execute()):
+                family.add_metric([queue], depth)
+        except Exception as e:
+            print(f"Error reading Celery queue depth: {e}")
+        yield family
+
+REGISTRY.register(CeleryQueueCollector())
+
+def metrics_response() -> Response:
+    """Prometheus exposition of this process, or of all workers in multiprocess mode"""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Aggregate across uvicorn/gunicorn worker processes
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CeleryQueueCollector())
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
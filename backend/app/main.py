@@ -3,12 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
+import asyncio
 import os
 from dotenv import load_dotenv
 
 from app.database import engine, get_db
 from app.routers import auth, notebooks, models, billing, deployments
 from app.models import Base
+from app.services.rate_limiter import RateLimitHeadersMiddleware
+from app.instrumentation import MetricsMiddleware, metrics_response
+from app.responses import FastJSONResponse
 
 load_dotenv()
 
@@ -19,15 +23,25 @@ Base.metadata.create_all(bind=engine)
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting ML Cloud Platform...")
+    deployments.deployment_cache.start_listener()
+    deployments.api_call_logger.start()
+    deployments.deployment_service.start_route_listener()
+    health_checks = asyncio.create_task(deployments.deployment_service.run_health_checks())
     yield
     # Shutdown
     print("Shutting down...")
+    health_checks.cancel()
+    deployments.deployment_cache.stop_listener()
+    deployments.api_call_logger.stop()
+    deployments.deployment_service.stop_route_listener()
+    await deployments.deployment_service.aclose()
 
 app = FastAPI(
     title="ML Cloud Platform API",
     description="Cloud platform for ML models with Jupyter notebooks and GPU support",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -37,8 +51,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "Retry-After"],
 )
 
+# Quota headers on rate-limited prediction endpoints
+app.add_middleware(RateLimitHeadersMiddleware)
+
+# Per-route request counts and latency; added last so it wraps everything else
+app.add_middleware(MetricsMiddleware)
+
 # Security
 security = HTTPBearer()
 
@@ -55,4 +76,8 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
\ No newline at end of file
@@ -0,0 +1,146 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Write-behind ApiCall logging
+API_CALL_LOG_ENQUEUED = Counter(
+    "api_call_log_enqueued_total",
+    "ApiCall events accepted into the write-behind buffer"
+)
+API_CALL_LOG_DROPPED = Counter(
+    "api_call_log_dropped_total",
+    "ApiCall events dropped because the write-behind buffer was full"
+)
+API_CALL_LOG_WRITTEN = Counter(
+    "api_call_log_written_total",
+    "ApiCall rows bulk-inserted into the database"
+)
+API_CALL_LOG_FLUSH_ERRORS = Counter(
+    "api_call_log_flush_errors_total",
+    "Failed ApiCall bulk inserts"
+)
+API_CALL_LOG_QUEUE_DEPTH = Gauge(
+    "api_call_log_queue_depth",
+    "ApiCall events waiting in the in-process buffer"
+)
+API_CALL_LOG_FLUSH_SECONDS = Histogram(
+    "api_call_log_flush_seconds",
+    "Time spent bulk-inserting one batch of ApiCall rows",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# Prediction result cache
+PREDICTION_CACHE_REQUESTS = Counter(
+    "prediction_cache_requests_total",
+    "Prediction cache lookups by outcome (hit, miss, coalesced)",
+    ["deployment_id", "result"]
+)
+PREDICTION_CACHE_ENTRIES = Gauge(
+    "prediction_cache_entries",
+    "Entries held in the in-process prediction cache",
+    ["deployment_id"]
+)
+PREDICTION_CACHE_BYTES = Gauge(
+    "prediction_cache_bytes",
+    "Approximate size of the in-process prediction cache",
+    ["deployment_id"]
+)
+
+# Per-deployment admission control
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Upstream predict calls holding an admission slot",
+    ["deployment_id"]
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot",
+    ["deployment_id"]
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time admitted requests spent waiting for a slot",
+    ["deployment_id"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed by admission control by reason (queue_full, deadline, timeout)",
+    ["deployment_id", "reason"]
+)
+
+# Canary and shadow traffic
+ROLLOUT_REQUESTS = Counter(
+    "rollout_requests_total",
+    "Predict calls during a rollout by arm (primary, canary, shadow) and outcome",
+    ["deployment_id", "arm", "outcome"]
+)
+ROLLOUT_SHADOW_DROPPED = Counter(
+    "rollout_shadow_dropped_total",
+    "Mirrored requests skipped because too many were already in flight",
+    ["deployment_id"]
+)
+
+# Replica circuit breakers and hedged requests
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Replica circuit breaker state changes by new state (open, half_open, closed)",
+    ["deployment_id", "state"]
+)
+CIRCUIT_BREAKER_REJECTED = Counter(
+    "circuit_breaker_rejected_total",
+    "Predict calls failed fast because every healthy replica's breaker was open",
+    ["deployment_id"]
+)
+HEDGED_REQUESTS = Counter(
+    "hedged_requests_total",
+    "Backup predict calls sent after the deployment's p95, and how many answered first",
+    ["deployment_id", "outcome"]
+)
+
+# HTTP routes, labelled by route template rather than raw path
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the first byte of its response",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Stages of the predict path
+PREDICT_STAGE_SECONDS = Histogram(
+    "predict_stage_seconds",
+    "Time spent in each stage of a predict request (auth, rate_limit, parse, upstream, log)",
+    ["stage"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+# SQLAlchemy connection pool
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool"
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond the pool size (negative while the pool is not yet full)"
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a pooled database connection, including connecting",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+# Docker Engine API
+DOCKER_API_SECONDS = Histogram(
+    "docker_api_seconds",
+    "Docker Engine API call time until response headers, by operation",
+    ["operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+DOCKER_API_ERRORS = Counter(
+    "docker_api_errors_total",
+    "Docker Engine API calls answered with an error status, by operation",
+    ["operation"]
+)
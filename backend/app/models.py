@@ -14,6 +14,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
+    pricing_tier = Column(String, default="free")  # free, pro, enterprise
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -55,6 +56,7 @@ class Model(Base):
     framework_version = Column(String)
     model_path = Column(String)  # S3 or local storage path
     requirements = Column(JSON)  # List of Python packages
+    version = Column(Integer, default=0)  # Bumped on every model file upload
     status = Column(String, default="training")  # training, ready, failed
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -72,16 +74,45 @@ class Deployment(Base):
     api_endpoint = Column(String, unique=True)
     api_key = Column(String, unique=True)
     status = Column(String, default="deploying")  # deploying, running, stopped, failed
+    stage = Column(String, default="queued")  # queued, building, starting, warming, ready, failed
+    stage_message = Column(Text, nullable=True)
+    stage_updated_at = Column(DateTime, nullable=True)
     instance_type = Column(String)  # cpu, gpu-t4, gpu-v100, etc.
+    serving_mode = Column(String, default="dedicated")  # dedicated containers, or shared multi-model pool
     auto_scaling = Column(Boolean, default=False)
     min_instances = Column(Integer, default=1)
     max_instances = Column(Integer, default=5)
+    replicas = Column(Integer, default=1)  # Current replica count
+    target_concurrency = Column(Float, default=4.0)  # In-flight requests per replica the autoscaler aims for
+    target_p95_ms = Column(Float, nullable=True)  # Scale up while p95 latency exceeds this
+    last_scaled_at = Column(DateTime, nullable=True)
+    pool_max_connections = Column(Integer, default=100)  # Upstream connection pool size
+    pool_max_keepalive = Column(Integer, default=20)  # Idle keep-alive connections kept open
+    request_timeout_seconds = Column(Float, default=30.0)
+    max_concurrency = Column(Integer, default=32)  # In-flight predict calls per gateway process
+    max_queue = Column(Integer, default=64)  # Requests allowed to wait for a slot
+    queue_timeout_ms = Column(Integer, default=2000)  # Longest a request may wait before it is shed
+    http2 = Column(Boolean, default=False)  # Model server speaks HTTP/2 (h2c)
+    hedging_enabled = Column(Boolean, default=False)  # Duplicate predict calls still unanswered after the p95 to a second replica
+    batching_enabled = Column(Boolean, default=False)  # Micro-batch concurrent requests in the model server
+    max_batch_size = Column(Integer, default=32)
+    max_batch_wait_ms = Column(Float, default=5.0)
+    workers = Column(Integer, default=1)  # Model server processes forked after the model is loaded
+    cache_enabled = Column(Boolean, default=False)  # Cache prediction results by request body
+    cache_backend = Column(String, default="memory")  # memory, redis
+    cache_ttl_seconds = Column(Integer, default=300)
+    cache_max_entries = Column(Integer, default=10000)
+    cache_max_bytes = Column(Integer, default=64 * 1024 * 1024)  # In-process backend only
+    rollout_mode = Column(String, nullable=True)  # canary, shadow, or none
+    candidate_deployment_id = Column(Integer, ForeignKey("deployments.id", ondelete="SET NULL"), nullable=True)  # New version being rolled out
+    candidate_weight = Column(Float, default=0.0)  # Share of traffic sent (canary) or mirrored (shadow) to the candidate
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     owner = relationship("User", back_populates="deployments")
     model = relationship("Model", back_populates="deployments")
     api_calls = relationship("ApiCall", back_populates="deployment")
+    scaling_events = relationship("ScalingEvent", back_populates="deployment")
 
 class UsageRecord(Base):
     __tablename__ = "usage_records"
@@ -95,7 +126,7 @@ class UsageRecord(Base):
     end_time = Column(DateTime)
     duration_minutes = Column(Float)
     cost = Column(Float)
-    metadata = Column(JSON)  # Additional usage details
+    usage_metadata = Column("metadata", JSON)  # Additional usage details; `metadata` is reserved by SQLAlchemy
     
     # Relationships
     user = relationship("User", back_populates="usage_records")
@@ -106,12 +137,30 @@ class ApiCall(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     deployment_id = Column(Integer, ForeignKey("deployments.id"))
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     response_time_ms = Column(Float)
     input_tokens = Column(Integer, default=0)
     output_tokens = Column(Integer, default=0)
+    row_count = Column(Integer, default=1)  # Rows scored by this call (>1 for batch requests)
     success = Column(Boolean, default=True)
     error_message = Column(String, nullable=True)
     
     # Relationships
-    deployment = relationship("Deployment", back_populates="api_calls")
\ No newline at end of file
+    deployment = relationship("Deployment", back_populates="api_calls")
+
+class ScalingEvent(Base):
+    __tablename__ = "scaling_events"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    deployment_id = Column(Integer, ForeignKey("deployments.id"), index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    previous_replicas = Column(Integer)
+    new_replicas = Column(Integer)
+    trigger = Column(String)  # autoscaler, manual
+    reason = Column(String)
+    request_rate = Column(Float, nullable=True)  # Requests per second over the window
+    concurrency = Column(Float, nullable=True)  # Estimated in-flight requests
+    p95_latency_ms = Column(Float, nullable=True)
+    
+    # Relationships
+    deployment = relationship("Deployment", back_populates="scaling_events")
\ No newline at end of file
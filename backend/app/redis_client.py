@@ -0,0 +1,88 @@
+import redis
+import redis.asyncio
+import os
+import threading
+from typing import Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Redis configuration
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+
+_client = None
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide Redis client, connecting lazily"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=5,
+            socket_connect_timeout=2,
+            health_check_interval=30
+        )
+    return _client
+
+_async_client = None
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the process-wide asyncio Redis client for use on request paths"""
+    global _async_client
+    if _async_client is None:
+        _async_client = redis.asyncio.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+            health_check_interval=30
+        )
+    return _async_client
+
+class ChannelListener:
+    """Background thread delivering messages from a Redis pub/sub channel.
+    
+    `on_reset` runs whenever the subscription is (re)established, since
+    messages published while disconnected are lost.
+    """
+    
+    def __init__(self, channel: str, on_message: Callable[[bytes], None], on_reset: Callable[[], None]):
+        self.channel = channel
+        self.on_message = on_message
+        self.on_reset = on_reset
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name=f"listener-{self.channel}", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _listen(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.on_reset()
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        self.on_message(message["data"])
+            except Exception as e:
+                print(f"Redis listener error on {self.channel}: {e}")
+                self.on_reset()
+                self._stop.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from typing import Any, Dict
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _default(value: Any) -> Any:
+    """Types orjson doesn't encode natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "tolist"):
+        # NumPy arrays orjson can't take directly (non-contiguous, object dtype) and NumPy scalars
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson, including NumPy arrays.
+
+    Returning one directly from a route also skips FastAPI's jsonable_encoder
+    and response_model pass, so use it for content that is already plain JSON.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+_adapters: Dict[Any, TypeAdapter] = {}
+
+def serialize_rows(schema: Any, rows: Any, status_code: int = 200) -> Response:
+    """Validate ORM rows against a response schema once and encode them straight to JSON bytes.
+
+    FastAPI would validate the rows, dump them to dicts and then encode those;
+    pydantic-core does the whole thing in one pass here. The route keeps its
+    response_model for the OpenAPI docs.
+    """
+    adapter = _adapters.get(schema)
+    if adapter is None:
+        adapter = _adapters[schema] = TypeAdapter(schema)
+    content = adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+    return Response(content=content, status_code=status_code, media_type="application/json")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, func
-from sqlalchemy import and_
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 import stripe
@@ -10,6 +10,7 @@ from app.database import get_db
 from app.models import User, UsageRecord, ApiCall, Deployment
 from app.schemas import BillingResponse
 from app.routers.auth import get_current_user
+from app.responses import serialize_rows
 
 router = APIRouter()
 
@@ -41,20 +42,11 @@ def get_usage(
     ).all()
     total_cost = sum(record.cost or 0 for record in total_usage)
     
-    return BillingResponse(
-        current_month_cost=current_month_cost,
-        total_cost=total_cost,
-        usage_records=[
-            {
-                "resource_type": record.resource_type,
-                "start_time": record.start_time,
-                "end_time": record.end_time,
-                "duration_minutes": record.duration_minutes,
-                "cost": record.cost
-            }
-            for record in usage_records
-        ]
-    )
+    return serialize_rows(BillingResponse, {
+        "current_month_cost": current_month_cost,
+        "total_cost": total_cost,
+        "usage_records": usage_records
+    })
 
 @router.get("/stats")
 def get_billing_stats(
@@ -1,24 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
+import asyncio
+import os
 import uuid
 from datetime import datetime
 
-from app.database import get_db
-from app.models import User, Deployment, Model, ApiCall
-from app.schemas import DeploymentCreate, DeploymentResponse
+from app.instrumentation import StageTimer
+from app.responses import FastJSONResponse, serialize_rows
+
+from app.database import get_db, SessionLocal
+from app.models import User, Deployment, Model, ScalingEvent
+from app.schemas import DeploymentCreate, DeploymentResponse, DeploymentProgressResponse, BatchPredictionRequest, BatchPredictionResponse, ScalingEventResponse, RolloutConfig, RolloutResponse
 from app.routers.auth import get_current_user
-from app.services.deployment_service import DeploymentService
+from app.services.deployment_service import DeploymentService, TENSOR_MEDIA_TYPES
+from app.services.deployment_cache import DeploymentCache, CachedDeployment
+from app.services.api_call_logger import ApiCallLogger
+from app.services.prediction_cache import PredictionCache
+from app.services.admission import AdmissionController, AdmissionRejected
+from app.services.circuit_breaker import CircuitOpen
+from app.services.deadlines import DEADLINE_HEADER, ClientDisconnected, DeadlineExceeded, until_disconnected
+from app.services.rate_limiter import RateLimiter
+from app.services.rollout import ROLLOUT_MODES, TrafficSplitter
+from app.services.bulk_scoring import DuplexStreamingResponse, iter_rows, score_rows
+from app.services.deployment_progress import progress_event, set_stage, stream_progress
+from app.services.autoscaler import scaling_lock
+from app.tasks import deploy_model_async
 
 router = APIRouter()
 deployment_service = DeploymentService()
+deployment_cache = DeploymentCache()
+api_call_logger = ApiCallLogger()
+prediction_cache = PredictionCache()
+admission = AdmissionController()
+rate_limiter = RateLimiter()
+traffic_splitter = TrafficSplitter()
+
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+STREAM_MAX_IN_FLIGHT = int(os.getenv("STREAM_MAX_IN_FLIGHT", "4"))
+
+def _is_tensor_media_type(header: str) -> bool:
+    """Whether a Content-Type or Accept header names a binary tensor format"""
+    return any(item.split(";")[0].strip().lower() in TENSOR_MEDIA_TYPES for item in (header or "").split(","))
+
+def _get_running_deployment(deployment_id: int, request: Request, db: Session) -> CachedDeployment:
+    """Look up a running deployment and check the caller's API key"""
+    deployment = deployment_cache.get(deployment_id)
+    if deployment is None:
+        row = db.query(Deployment).filter(Deployment.id == deployment_id).first()
+        if row:
+            deployment = deployment_cache.put(row)
+    
+    if not deployment or deployment.status != "running":
+        raise HTTPException(status_code=404, detail="Deployment not found or not running")
+    
+    # Verify API key
+    if not deployment.check_api_key(request.headers.get("X-API-Key")):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    return deployment
+
+async def _check_rate_limit(deployment: CachedDeployment, request: Request):
+    """Take a token from the caller's bucket; the headers are added to the response by middleware"""
+    decision = await rate_limiter.acquire(deployment)
+    if decision is None:
+        return
+    request.state.rate_limit = decision
+    if not decision.allowed:
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=decision.headers())
+
+def _request_deadline(request: Request, deployment: CachedDeployment) -> float:
+    """loop.time() by which the response is due: the caller's X-Request-Timeout-Ms, capped at the deployment's timeout"""
+    budget = deployment.request_timeout_seconds
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            budget = min(float(header) / 1000.0, budget)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"{DEADLINE_HEADER} must be a number of milliseconds")
+    return asyncio.get_running_loop().time() + budget
 
 @router.get("/", response_model=List[DeploymentResponse])
 def get_deployments(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     deployments = db.query(Deployment).filter(Deployment.owner_id == current_user.id).all()
-    return deployments
+    return serialize_rows(List[DeploymentResponse], deployments)
 
-@router.post("/", response_model=DeploymentResponse)
+@router.post("/", response_model=DeploymentResponse, status_code=202)
 def create_deployment(
     deployment: DeploymentCreate,
     current_user: User = Depends(get_current_user),
@@ -46,33 +115,47 @@ def create_deployment(
         api_endpoint=api_endpoint,
         api_key=api_key,
         status="deploying",
+        stage="queued",
+        stage_message="Waiting for a deploy worker",
+        stage_updated_at=datetime.utcnow(),
         instance_type=deployment.instance_type,
+        serving_mode=deployment.serving_mode,
         auto_scaling=deployment.auto_scaling,
         min_instances=deployment.min_instances,
-        max_instances=deployment.max_instances
+        max_instances=deployment.max_instances,
+        replicas=deployment.min_instances,
+        target_concurrency=deployment.target_concurrency,
+        target_p95_ms=deployment.target_p95_ms,
+        pool_max_connections=deployment.pool_max_connections,
+        pool_max_keepalive=deployment.pool_max_keepalive,
+        request_timeout_seconds=deployment.request_timeout_seconds,
+        max_concurrency=deployment.max_concurrency,
+        max_queue=deployment.max_queue,
+        queue_timeout_ms=deployment.queue_timeout_ms,
+        http2=deployment.http2,
+        hedging_enabled=deployment.hedging_enabled,
+        batching_enabled=deployment.batching_enabled,
+        max_batch_size=deployment.max_batch_size,
+        max_batch_wait_ms=deployment.max_batch_wait_ms,
+        workers=deployment.workers,
+        cache_enabled=deployment.cache_enabled,
+        cache_backend=deployment.cache_backend,
+        cache_ttl_seconds=deployment.cache_ttl_seconds,
+        cache_max_entries=deployment.cache_max_entries,
+        cache_max_bytes=deployment.cache_max_bytes
     )
     db.add(db_deployment)
     db.commit()
     db.refresh(db_deployment)
     
+    # Build and start the deployment on a deploy worker; follow it via /progress
     try:
-        # Deploy model
-        deployment_info = deployment_service.deploy_model(
-            deployment_id=db_deployment.id,
-            model=model,
-            deployment_config=deployment
-        )
-        
-        # Update deployment status
-        db_deployment.status = "running"
-        db.commit()
-        
-        return db_deployment
-        
+        deploy_model_async.delay(db_deployment.id, model.id)
     except Exception as e:
-        db_deployment.status = "failed"
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Failed to deploy model: {str(e)}")
+        set_stage(db, db_deployment, "failed", f"Could not queue deployment: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Failed to queue deployment: {str(e)}")
+    
+    return db_deployment
 
 @router.get("/{deployment_id}", response_model=DeploymentResponse)
 def get_deployment(
@@ -90,61 +173,269 @@ def get_deployment(
     
     return deployment
 
-@router.post("/{deployment_id}/predict")
-async def predict(
+@router.get("/{deployment_id}/progress", response_model=DeploymentProgressResponse)
+def get_deployment_progress(
     deployment_id: int,
-    request: Request,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Get deployment
     deployment = db.query(Deployment).filter(
         Deployment.id == deployment_id,
-        Deployment.status == "running"
+        Deployment.owner_id == current_user.id
     ).first()
     
     if not deployment:
-        raise HTTPException(status_code=404, detail="Deployment not found or not running")
+        raise HTTPException(status_code=404, detail="Deployment not found")
     
-    # Verify API key
-    api_key = request.headers.get("X-API-Key")
-    if api_key != deployment.api_key:
-        raise HTTPException(status_code=401, detail="Invalid API key")
+    return progress_event(deployment)
+
+@router.get("/{deployment_id}/progress/events")
+def stream_deployment_progress(
+    deployment_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Server-sent events with each pipeline stage until the deployment is ready or failed"""
+    deployment = db.query(Deployment).filter(
+        Deployment.id == deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    
+    def snapshot():
+        session = SessionLocal()
+        try:
+            row = session.query(Deployment).filter(Deployment.id == deployment_id).first()
+            return progress_event(row) if row else None
+        finally:
+            session.close()
+    
+    return StreamingResponse(
+        stream_progress(deployment_id, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/{deployment_id}/predict")
+async def predict(
+    deployment_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    timer = StageTimer()
+    deployment = _get_running_deployment(deployment_id, request, db)
+    deadline = _request_deadline(request, deployment)
+    timer.mark("auth")
+    await _check_rate_limit(deployment, request)
+    timer.mark("rate_limit")
     
     try:
         start_time = datetime.utcnow()
         
-        # Get request body
-        body = await request.json()
+        content_type = request.headers.get("content-type", "application/json")
+        accept = request.headers.get("accept")
+        
+        # Cache entries are keyed by the primary, so canary answers bypass the cache
+        canary = traffic_splitter.pick_canary(deployment)
         
-        # Make prediction
-        result = await deployment_service.predict(deployment.id, body)
+        if deployment.cache_enabled and not canary and not _is_tensor_media_type(content_type) and not _is_tensor_media_type(accept):
+            # Make prediction, served from the result cache
+            body = await request.json()
+            timer.mark("parse")
+            result = FastJSONResponse(await until_disconnected(request.receive, prediction_cache.get_or_compute(
+                deployment,
+                body,
+                lambda: admission.run(deployment, lambda: traffic_splitter.call(
+                    deployment,
+                    lambda target_id: deployment_service.predict(target_id, body, deadline),
+                    # Shadows run after the answer is sent, on the candidate's own timeout
+                    lambda target_id: deployment_service.predict(target_id, body),
+                    canary
+                ), deadline)
+            )))
+        else:
+            # Forward the body as-is; the model server decodes JSON or binary tensors itself
+            body = await request.body()
+            timer.mark("parse")
+            content, media_type = await until_disconnected(request.receive, admission.run(
+                deployment,
+                lambda: traffic_splitter.call(
+                    deployment,
+                    lambda target_id: deployment_service.predict_raw(target_id, body, content_type, accept, deadline),
+                    lambda target_id: deployment_service.predict_raw(target_id, body, content_type, accept),
+                    canary
+                ),
+                deadline
+            ))
+            result = Response(content=content, media_type=media_type)
+        timer.mark("upstream")
         
         end_time = datetime.utcnow()
         response_time = (end_time - start_time).total_seconds() * 1000
         
         # Log API call
-        api_call = ApiCall(
+        api_call_logger.log(
             deployment_id=deployment.id,
             response_time_ms=response_time,
             success=True
         )
-        db.add(api_call)
-        db.commit()
+        timer.mark("log")
         
         return result
         
+    except (AdmissionRejected, CircuitOpen) as e:
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            success=False,
+            error_message=f"Rejected: {e.detail}"
+        )
+        
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        
+    except (DeadlineExceeded, ClientDisconnected) as e:
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            success=False,
+            error_message=e.detail
+        )
+        
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
     except Exception as e:
         # Log failed API call
-        api_call = ApiCall(
+        api_call_logger.log(
             deployment_id=deployment.id,
             success=False,
             error_message=str(e)
         )
-        db.add(api_call)
-        db.commit()
         
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@router.post("/{deployment_id}/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    deployment_id: int,
+    batch: BatchPredictionRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    deployment = _get_running_deployment(deployment_id, request, db)
+    deadline = _request_deadline(request, deployment)
+    await _check_rate_limit(deployment, request)
+    
+    row_count = len(batch.instances)
+    if row_count == 0:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    if row_count > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows")
+    
+    try:
+        start_time = datetime.utcnow()
+        
+        # One vectorized call for the whole batch
+        result = await until_disconnected(request.receive, admission.run(
+            deployment,
+            lambda: deployment_service.predict_batch(deployment.id, {"instances": batch.instances}, deadline),
+            deadline
+        ))
+        
+        end_time = datetime.utcnow()
+        response_time = (end_time - start_time).total_seconds() * 1000
+        
+        # Log one API call for the whole batch
+        failed_rows = len(result.get("errors", []))
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            response_time_ms=response_time,
+            row_count=row_count,
+            success=True,
+            error_message=f"{failed_rows} of {row_count} rows failed" if failed_rows else None
+        )
+        
+        # The model server already validated this shape, so skip re-validating thousands of rows
+        return FastJSONResponse(result)
+        
+    except (AdmissionRejected, CircuitOpen) as e:
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            row_count=row_count,
+            success=False,
+            error_message=f"Rejected: {e.detail}"
+        )
+        
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+        
+    except (DeadlineExceeded, ClientDisconnected) as e:
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            row_count=row_count,
+            success=False,
+            error_message=e.detail
+        )
+        
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+    except Exception as e:
+        # Log failed API call
+        api_call_logger.log(
+            deployment_id=deployment.id,
+            row_count=row_count,
+            success=False,
+            error_message=str(e)
+        )
+        
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+@router.post("/{deployment_id}/predict/stream")
+async def predict_stream(
+    deployment_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Score an NDJSON or CSV upload, streaming NDJSON predictions back as chunks complete"""
+    deployment = _get_running_deployment(deployment_id, request, db)
+    await _check_rate_limit(deployment, request)
+    content_type = request.headers.get("content-type", "")
+    
+    async def results():
+        start_time = datetime.utcnow()
+        row_count = 0
+        error_message = None
+        
+        async def counted_rows():
+            nonlocal row_count
+            async for entry in iter_rows(request.stream(), content_type):
+                row_count += 1
+                yield entry
+        
+        try:
+            async for chunk in score_rows(
+                counted_rows(),
+                lambda rows: admission.run(
+                    deployment,
+                    lambda: deployment_service.predict_batch(deployment.id, {"instances": rows})
+                ),
+                chunk_rows=STREAM_CHUNK_ROWS,
+                max_in_flight=STREAM_MAX_IN_FLIGHT
+            ):
+                yield chunk
+        except Exception as e:
+            error_message = str(e)
+            raise
+        finally:
+            # Log one API call for the whole upload
+            end_time = datetime.utcnow()
+            api_call_logger.log(
+                deployment_id=deployment.id,
+                response_time_ms=(end_time - start_time).total_seconds() * 1000,
+                row_count=row_count,
+                success=error_message is None,
+                error_message=error_message
+            )
+    
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.post("/{deployment_id}/scale")
 def scale_deployment(
     deployment_id: int,
@@ -160,21 +451,162 @@ def scale_deployment(
     if not deployment:
         raise HTTPException(status_code=404, detail="Deployment not found")
     
+    if deployment.serving_mode == "shared":
+        raise HTTPException(status_code=400, detail="Deployments in the shared model pool can't be scaled individually")
+    
+    # The same lock the autoscaler holds, so the two never resize a deployment at once
+    lock = scaling_lock(deployment_id)
+    if not lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="Deployment is already being scaled")
+    
     try:
-        deployment_service.scale_deployment(deployment_id, scale_config)
-        
         # Update deployment config
         if "min_instances" in scale_config:
             deployment.min_instances = scale_config["min_instances"]
         if "max_instances" in scale_config:
             deployment.max_instances = scale_config["max_instances"]
         
+        if deployment.min_instances > deployment.max_instances:
+            raise HTTPException(status_code=400, detail="min_instances cannot exceed max_instances")
+        
+        # Keep the replica count inside the configured bounds
+        previous_replicas = deployment.replicas
+        replicas = scale_config.get("replicas", deployment.min_instances)
+        replicas = min(max(replicas, deployment.min_instances), deployment.max_instances)
+        replicas = deployment_service.scale_deployment(deployment_id, {"replicas": replicas})
+        
+        deployment.replicas = replicas
+        deployment.last_scaled_at = datetime.utcnow()
+        db.add(ScalingEvent(
+            deployment_id=deployment_id,
+            previous_replicas=previous_replicas,
+            new_replicas=replicas,
+            trigger="manual",
+            reason=f"Scaled by {current_user.username}"
+        ))
         db.commit()
+        deployment_cache.invalidate(deployment_id)
         
-        return {"message": "Deployment scaled successfully"}
+        return {"message": "Deployment scaled successfully", "replicas": replicas}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to scale deployment: {str(e)}")
+    finally:
+        try:
+            lock.release()
+        except Exception:
+            # Expired while the resize ran
+            pass
+
+@router.get("/{deployment_id}/scaling-events", response_model=List[ScalingEventResponse])
+def get_scaling_events(
+    deployment_id: int,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    deployment = db.query(Deployment).filter(
+        Deployment.id == deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    
+    return db.query(ScalingEvent).filter(
+        ScalingEvent.deployment_id == deployment_id
+    ).order_by(ScalingEvent.timestamp.desc()).limit(limit).all()
+
+def _rollout_response(deployment: Deployment) -> RolloutResponse:
+    return RolloutResponse(
+        deployment_id=deployment.id,
+        mode=deployment.rollout_mode,
+        candidate_deployment_id=deployment.candidate_deployment_id,
+        weight=deployment.candidate_weight or 0.0,
+        **traffic_splitter.summary(deployment.id)
+    )
+
+@router.get("/{deployment_id}/rollout", response_model=RolloutResponse)
+def get_rollout(
+    deployment_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Rollout settings with latency, errors and output agreement of each version"""
+    deployment = db.query(Deployment).filter(
+        Deployment.id == deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    
+    return _rollout_response(deployment)
+
+@router.put("/{deployment_id}/rollout", response_model=RolloutResponse)
+def set_rollout(
+    deployment_id: int,
+    config: RolloutConfig,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Send a share of predict traffic to a candidate deployment (canary) or mirror it there (shadow)"""
+    deployment = db.query(Deployment).filter(
+        Deployment.id == deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    
+    if config.mode not in ROLLOUT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ROLLOUT_MODES)}")
+    
+    candidate = db.query(Deployment).filter(
+        Deployment.id == config.candidate_deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not candidate or candidate.id == deployment.id:
+        raise HTTPException(status_code=404, detail="Candidate deployment not found")
+    
+    deployment.rollout_mode = config.mode
+    deployment.candidate_deployment_id = candidate.id
+    deployment.candidate_weight = config.weight
+    db.commit()
+    deployment_cache.invalidate(deployment_id)
+    prediction_cache.drop(deployment_id)
+    
+    # Compare the versions from a clean slate
+    traffic_splitter.reset(deployment_id)
+    
+    return _rollout_response(deployment)
+
+@router.delete("/{deployment_id}/rollout", response_model=RolloutResponse)
+def clear_rollout(
+    deployment_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Send all traffic back to the deployment itself; the comparison stats are kept"""
+    deployment = db.query(Deployment).filter(
+        Deployment.id == deployment_id,
+        Deployment.owner_id == current_user.id
+    ).first()
+    
+    if not deployment:
+        raise HTTPException(status_code=404, detail="Deployment not found")
+    
+    deployment.rollout_mode = None
+    deployment.candidate_deployment_id = None
+    deployment.candidate_weight = 0.0
+    db.commit()
+    deployment_cache.invalidate(deployment_id)
+    prediction_cache.drop(deployment_id)
+    
+    return _rollout_response(deployment)
 
 @router.delete("/{deployment_id}")
 def delete_deployment(
@@ -194,9 +626,19 @@ def delete_deployment(
         # Stop deployment
         deployment_service.stop_deployment(deployment_id)
         
+        # Stop rolling out this deployment as a candidate of others
+        primaries = db.query(Deployment).filter(Deployment.candidate_deployment_id == deployment_id).all()
+        for primary in primaries:
+            primary.rollout_mode = None
+            primary.candidate_deployment_id = None
+        
         # Delete deployment record
         db.delete(deployment)
         db.commit()
+        deployment_cache.invalidate(deployment_id)
+        for primary in primaries:
+            deployment_cache.invalidate(primary.id)
+        prediction_cache.drop(deployment_id)
         
         return {"message": "Deployment deleted successfully"}
         
@@ -6,10 +6,12 @@ import os
 from datetime import datetime
 
 from app.database import get_db
-from app.models import User, Model, Notebook
+from app.models import User, Model, Notebook, Deployment
 from app.schemas import ModelCreate, ModelResponse
 from app.routers.auth import get_current_user
+from app.responses import serialize_rows
 from app.services.model_service import ModelService
+from app.services.deployment_cache import publish_invalidation
 
 router = APIRouter()
 model_service = ModelService()
@@ -17,7 +19,7 @@ model_service = ModelService()
 @router.get("/", response_model=List[ModelResponse])
 def get_models(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     models = db.query(Model).filter(Model.owner_id == current_user.id).all()
-    return models
+    return serialize_rows(List[ModelResponse], models)
 
 @router.post("/", response_model=ModelResponse)
 def create_model(
@@ -73,9 +75,15 @@ def upload_model_file(
         
         # Update model record
         model.model_path = file_path
+        model.version = (model.version or 0) + 1
         model.status = "ready"
         db.commit()
         
+        # Cached predictions are keyed on the model version
+        deployments = db.query(Deployment.id).filter(Deployment.model_id == model.id).all()
+        for deployment in deployments:
+            publish_invalidation(deployment.id)
+        
         return {"message": "Model file uploaded successfully", "path": file_path}
         
     except Exception as e:
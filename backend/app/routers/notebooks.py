@@ -10,6 +10,7 @@ from app.database import get_db
 from app.models import User, Notebook, UsageRecord
 from app.schemas import NotebookCreate, NotebookResponse
 from app.routers.auth import get_current_user
+from app.responses import serialize_rows
 from app.services.container_service import ContainerService
 
 router = APIRouter()
@@ -18,7 +19,7 @@ container_service = ContainerService()
 @router.get("/", response_model=List[NotebookResponse])
 def get_notebooks(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     notebooks = db.query(Notebook).filter(Notebook.owner_id == current_user.id).all()
-    return notebooks
+    return serialize_rows(List[NotebookResponse], notebooks)
 
 @router.post("/", response_model=NotebookResponse)
 def create_notebook(
@@ -63,7 +64,7 @@ def create_notebook(
             notebook_id=db_notebook.id,
             resource_type="notebook_runtime",
             start_time=db_notebook.created_at,
-            metadata={
+            usage_metadata={
                 "gpu_type": notebook.gpu_type,
                 "cpu_cores": notebook.cpu_cores,
                 "memory_gb": notebook.memory_gb
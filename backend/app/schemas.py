@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -14,6 +14,7 @@ class UserCreate(UserBase):
 class UserResponse(UserBase):
     id: int
     is_active: bool
+    pricing_tier: Optional[str] = None
     created_at: datetime
     
     class Config:
@@ -78,9 +79,29 @@ class ModelResponse(ModelBase):
 class DeploymentBase(BaseModel):
     name: str
     instance_type: str = "cpu"
+    serving_mode: str = "dedicated"  # dedicated, shared
     auto_scaling: bool = False
     min_instances: int = 1
     max_instances: int = 5
+    target_concurrency: float = 4.0
+    target_p95_ms: Optional[float] = None
+    pool_max_connections: int = 100
+    pool_max_keepalive: int = 20
+    request_timeout_seconds: float = 30.0
+    max_concurrency: int = 32
+    max_queue: int = 64
+    queue_timeout_ms: int = 2000
+    http2: bool = False
+    hedging_enabled: bool = False
+    batching_enabled: bool = False
+    max_batch_size: int = 32
+    max_batch_wait_ms: float = 5.0
+    workers: int = 1
+    cache_enabled: bool = False
+    cache_backend: str = "memory"
+    cache_ttl_seconds: int = 300
+    cache_max_entries: int = 10000
+    cache_max_bytes: int = 64 * 1024 * 1024
 
 class DeploymentCreate(DeploymentBase):
     model_id: int
@@ -92,11 +113,72 @@ class DeploymentResponse(DeploymentBase):
     api_endpoint: str
     api_key: str
     status: str
+    stage: Optional[str]
+    stage_message: Optional[str]
+    replicas: Optional[int]
+    rollout_mode: Optional[str] = None
+    candidate_deployment_id: Optional[int] = None
+    candidate_weight: Optional[float] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class DeploymentProgressResponse(BaseModel):
+    deployment_id: int
+    status: str
+    stage: Optional[str]
+    message: Optional[str]
+    updated_at: Optional[datetime]
+
+class RolloutConfig(BaseModel):
+    mode: str  # canary, shadow
+    candidate_deployment_id: int
+    weight: float = Field(0.1, ge=0.0, le=1.0)
+
+class RolloutArmStats(BaseModel):
+    requests: int
+    errors: int
+    error_rate: float
+    p50_latency_ms: Optional[float]
+    p95_latency_ms: Optional[float]
+
+class RolloutResponse(BaseModel):
+    deployment_id: int
+    mode: Optional[str]
+    candidate_deployment_id: Optional[int]
+    weight: float
+    arms: Dict[str, RolloutArmStats]
+    compared: int
+    agreement_rate: Optional[float]
+
+# Prediction schemas
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
+
+class RowError(BaseModel):
+    index: int
+    error: str
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[Any]
+    errors: List[RowError] = []
+
+class ScalingEventResponse(BaseModel):
+    id: int
+    deployment_id: int
+    timestamp: datetime
+    previous_replicas: int
+    new_replicas: int
+    trigger: str
+    reason: Optional[str]
+    request_rate: Optional[float]
+    concurrency: Optional[float]
+    p95_latency_ms: Optional[float]
+    
+    class Config:
+        from_attributes = True
+
 # Usage schemas
 class UsageRecord(BaseModel):
     resource_type: str
@@ -0,0 +1,120 @@
+import asyncio
+import math
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+from app.services.deployment_cache import CachedDeployment
+
+class AdmissionRejected(Exception):
+    """A request was shed instead of queued; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+class DeploymentGate:
+    """Concurrency slots and a FIFO wait queue for one deployment"""
+
+    def __init__(self, deployment_id: int):
+        self.deployment_id = str(deployment_id)
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.service_seconds = 0.05  # EWMA of upstream time per request
+
+    def expected_wait(self, position: int, limit: int) -> float:
+        """Time until the request at this queue position gets a slot"""
+        return math.ceil(position / limit) * self.service_seconds
+
+    def observe(self, seconds: float):
+        self.service_seconds += 0.2 * (seconds - self.service_seconds)
+
+    def release(self):
+        """Hand the slot to the next live waiter, or free it"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.update_gauges()
+                return
+        self.in_flight -= 1
+        self.update_gauges()
+
+    def update_gauges(self):
+        ADMISSION_QUEUE_DEPTH.labels(self.deployment_id).set(len(self.waiters))
+        ADMISSION_IN_FLIGHT.labels(self.deployment_id).set(self.in_flight)
+
+class AdmissionController:
+    """Per-deployment admission control in front of the model servers.
+
+    Each deployment gets max_concurrency in-flight upstream calls per gateway
+    process and a bounded FIFO queue behind them. Requests are shed with 429
+    when the queue is full and with 503 when they can't get a slot before
+    their deadline, so one overloaded deployment doesn't slow down the rest.
+    """
+
+    def __init__(self):
+        self._gates: Dict[int, DeploymentGate] = {}
+
+    async def run(self, deployment: CachedDeployment, compute: Callable[[], Awaitable[Any]], deadline: Optional[float] = None) -> Any:
+        """Run compute once a slot is free; deadline is the loop.time() by which the response is due"""
+        gate = self._gates.get(deployment.id)
+        if gate is None:
+            gate = self._gates[deployment.id] = DeploymentGate(deployment.id)
+
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        start_by = queued_at + deployment.queue_timeout_ms / 1000.0
+        if deadline is not None:
+            # Leave the usual upstream time before the response is due
+            start_by = min(start_by, deadline - gate.service_seconds)
+
+        if gate.in_flight < deployment.max_concurrency and not gate.waiters:
+            gate.in_flight += 1
+            gate.update_gauges()
+        else:
+            await self._wait(gate, deployment, start_by)
+        ADMISSION_WAIT_SECONDS.labels(gate.deployment_id).observe(loop.time() - queued_at)
+
+        started_at = loop.time()
+        try:
+            return await compute()
+        finally:
+            gate.observe(loop.time() - started_at)
+            gate.release()
+
+    async def _wait(self, gate: DeploymentGate, deployment: CachedDeployment, deadline: float):
+        loop = asyncio.get_running_loop()
+        position = len(gate.waiters) + 1
+        expected = gate.expected_wait(position, deployment.max_concurrency)
+        retry_after = max(math.ceil(expected), 1)
+
+        if len(gate.waiters) >= deployment.max_queue:
+            ADMISSION_REJECTED.labels(gate.deployment_id, "queue_full").inc()
+            raise AdmissionRejected(429, "Deployment is at capacity, retry later", retry_after)
+        if loop.time() + expected > deadline:
+            # It would time out in the queue anyway, so fail now rather than later
+            ADMISSION_REJECTED.labels(gate.deployment_id, "deadline").inc()
+            raise AdmissionRejected(503, "Deployment can't serve the request before its deadline", retry_after)
+
+        waiter = loop.create_future()
+        gate.waiters.append(waiter)
+        gate.update_gauges()
+        try:
+            await asyncio.wait_for(waiter, deadline - loop.time())
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived as we gave up; pass it on
+                gate.release()
+            else:
+                try:
+                    gate.waiters.remove(waiter)
+                except ValueError:
+                    pass
+                gate.update_gauges()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_REJECTED.labels(gate.deployment_id, "timeout").inc()
+            raise AdmissionRejected(503, "Timed out waiting for a free slot", retry_after)
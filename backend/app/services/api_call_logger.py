@@ -0,0 +1,190 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.metrics import (
+    API_CALL_LOG_DROPPED,
+    API_CALL_LOG_ENQUEUED,
+    API_CALL_LOG_FLUSH_ERRORS,
+    API_CALL_LOG_FLUSH_SECONDS,
+    API_CALL_LOG_QUEUE_DEPTH,
+    API_CALL_LOG_WRITTEN,
+)
+from app.models import ApiCall
+from app.redis_client import get_redis
+
+STREAM_KEY = "api-calls"
+CONSUMER_GROUP = "api-call-writers"
+
+class ApiCallLogger:
+    """Write-behind buffer for ApiCall rows.
+    
+    Request handlers only append to a bounded in-process queue. A background
+    thread drains it every `batch_size` rows or `flush_interval_ms` and either
+    bulk-inserts into Postgres ("memory" backend) or appends to a Redis stream
+    that every worker consumes through a shared consumer group ("redis" backend).
+    """
+    
+    def __init__(self, backend: str = None, max_queue_size: int = None, batch_size: int = None, flush_interval_ms: float = None):
+        self.backend = backend or os.getenv("API_CALL_LOG_BACKEND", "memory")
+        self.batch_size = batch_size or int(os.getenv("API_CALL_LOG_BATCH_SIZE", "500"))
+        self.flush_interval = (flush_interval_ms or float(os.getenv("API_CALL_LOG_FLUSH_MS", "1000"))) / 1000.0
+        self.stream_maxlen = int(os.getenv("API_CALL_LOG_STREAM_MAXLEN", "1000000"))
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(
+            maxsize=max_queue_size or int(os.getenv("API_CALL_LOG_QUEUE_SIZE", "10000"))
+        )
+        self._consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def log(self, deployment_id: int, response_time_ms: Optional[float] = None, success: bool = True,
+            error_message: Optional[str] = None, row_count: int = 1):
+        """Record an API call without blocking on the database"""
+        event = {
+            "deployment_id": deployment_id,
+            "timestamp": datetime.utcnow(),
+            "response_time_ms": response_time_ms,
+            "success": success,
+            "error_message": error_message,
+            "row_count": row_count
+        }
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            API_CALL_LOG_DROPPED.inc()
+            return
+        API_CALL_LOG_ENQUEUED.inc()
+    
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        targets = [self._drain_loop]
+        if self.backend == "redis":
+            targets.append(self._consume_loop)
+        for target in targets:
+            thread = threading.Thread(target=target, name=f"api-call-logger-{target.__name__}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Stop the background threads after flushing what is still buffered"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+    
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block up to one flush interval, then return up to batch_size buffered events"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        API_CALL_LOG_QUEUE_DEPTH.set(self._queue.qsize())
+        return batch
+    
+    def _drain_loop(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            if self.backend == "redis":
+                self._publish(batch)
+            else:
+                self._write(batch)
+    
+    def _write(self, rows: List[Dict[str, Any]]) -> bool:
+        """Bulk-insert ApiCall rows with a single executemany"""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.execute(insert(ApiCall), rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            API_CALL_LOG_FLUSH_ERRORS.inc()
+            print(f"Error writing {len(rows)} API call rows: {e}")
+            return False
+        finally:
+            db.close()
+        API_CALL_LOG_WRITTEN.inc(len(rows))
+        API_CALL_LOG_FLUSH_SECONDS.observe(time.perf_counter() - start)
+        return True
+    
+    def _publish(self, rows: List[Dict[str, Any]]):
+        """Append buffered events to the shared Redis stream"""
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for row in rows:
+                event = dict(row, timestamp=row["timestamp"].isoformat())
+                pipe.xadd(STREAM_KEY, {"event": json.dumps(event)}, maxlen=self.stream_maxlen, approximate=True)
+            pipe.execute()
+        except Exception as e:
+            # Redis is unavailable, so write this batch directly instead of losing it
+            print(f"Error publishing API calls to Redis, writing directly: {e}")
+            self._write(rows)
+    
+    def _consume_loop(self):
+        redis_client = get_redis()
+        try:
+            redis_client.xgroup_create(STREAM_KEY, CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception:
+            pass  # Group already exists
+        
+        # Pick up our own unacknowledged entries first, e.g. after a restart
+        last_id = "0"
+        while not self._stop.is_set():
+            try:
+                response = redis_client.xreadgroup(
+                    CONSUMER_GROUP,
+                    self._consumer_name,
+                    {STREAM_KEY: last_id},
+                    count=self.batch_size,
+                    block=int(self.flush_interval * 1000)
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    if last_id == "0":
+                        last_id = ">"
+                    elif self._claim_abandoned(redis_client):
+                        last_id = "0"
+                    continue
+                
+                rows = []
+                for _, fields in entries:
+                    event = json.loads(fields[b"event"])
+                    event["timestamp"] = datetime.fromisoformat(event["timestamp"])
+                    rows.append(event)
+                if self._write(rows):
+                    entry_ids = [entry_id for entry_id, _ in entries]
+                    redis_client.xack(STREAM_KEY, CONSUMER_GROUP, *entry_ids)
+                    redis_client.xdel(STREAM_KEY, *entry_ids)
+            except Exception as e:
+                print(f"API call stream consumer error: {e}")
+                self._stop.wait(1.0)
+    
+    def _claim_abandoned(self, redis_client) -> bool:
+        """Take over entries left pending by workers that died mid-batch"""
+        response = redis_client.xautoclaim(
+            STREAM_KEY,
+            CONSUMER_GROUP,
+            self._consumer_name,
+            min_idle_time=60000,
+            count=self.batch_size,
+            justid=True
+        )
+        return bool(response)
@@ -0,0 +1,85 @@
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models import ApiCall, Deployment
+from app.redis_client import get_redis
+
+# Longest a resize may hold a deployment's lock; replicas wait up to a minute each for health
+SCALE_LOCK_TIMEOUT = int(os.getenv("AUTOSCALE_LOCK_TIMEOUT", "900"))
+
+def scaling_lock(deployment_id: int):
+    """Redis lock held while a deployment is resized, by the autoscaler or a user"""
+    return get_redis().lock(f"autoscale:{deployment_id}", timeout=SCALE_LOCK_TIMEOUT)
+
+class Autoscaler:
+    """Sizes deployment replica counts from recent ApiCall traffic.
+    
+    In-flight concurrency is estimated with Little's law (request rate x mean
+    latency) so the controller can run out of process, e.g. from Celery beat,
+    without seeing the API workers' in-memory counters.
+    """
+    
+    def __init__(self):
+        self.window_seconds = int(os.getenv("AUTOSCALE_WINDOW_SECONDS", "60"))
+        self.scale_up_cooldown = timedelta(seconds=int(os.getenv("AUTOSCALE_SCALE_UP_COOLDOWN", "60")))
+        self.scale_down_cooldown = timedelta(seconds=int(os.getenv("AUTOSCALE_SCALE_DOWN_COOLDOWN", "300")))
+        # Only scale down once load would fit in fewer replicas with this much headroom
+        self.scale_down_headroom = float(os.getenv("AUTOSCALE_SCALE_DOWN_HEADROOM", "0.7"))
+    
+    def collect_stats(self, db: Session, now: datetime) -> Dict[int, Dict[str, float]]:
+        """Request rate, estimated concurrency and p95 latency per deployment over the window"""
+        since = now - timedelta(seconds=self.window_seconds)
+        # Shed and failed calls are load too, so every call counts toward the arrival
+        # rate; only successful ones say how long serving takes (aggregates skip NULLs)
+        served_latency = case((ApiCall.success == True, ApiCall.response_time_ms))
+        rows = db.query(
+            ApiCall.deployment_id,
+            func.count(ApiCall.id).label("requests"),
+            func.avg(served_latency).label("avg_latency_ms"),
+            func.percentile_cont(0.95).within_group(served_latency).label("p95_latency_ms")
+        ).filter(
+            ApiCall.timestamp >= since
+        ).group_by(ApiCall.deployment_id).all()
+        
+        stats = {}
+        for row in rows:
+            request_rate = row.requests / self.window_seconds
+            stats[row.deployment_id] = {
+                "request_rate": request_rate,
+                "concurrency": request_rate * float(row.avg_latency_ms or 0) / 1000,
+                "p95_latency_ms": float(row.p95_latency_ms or 0)
+            }
+        return stats
+    
+    def decide(self, deployment: Deployment, stats: Optional[Dict[str, float]], now: datetime) -> Optional[Tuple[int, str]]:
+        """Return (replicas, reason) if the deployment should be resized, otherwise None"""
+        stats = stats or {"request_rate": 0.0, "concurrency": 0.0, "p95_latency_ms": 0.0}
+        current = deployment.replicas or deployment.min_instances or 1
+        target_concurrency = deployment.target_concurrency or 4.0
+        
+        desired = max(math.ceil(stats["concurrency"] / target_concurrency), 1)
+        reason = f"concurrency {stats['concurrency']:.2f} at target {target_concurrency:g} per replica"
+        
+        if deployment.target_p95_ms and stats["p95_latency_ms"] > deployment.target_p95_ms and desired <= current:
+            desired = current + 1
+            reason = f"p95 latency {stats['p95_latency_ms']:.0f}ms above target {deployment.target_p95_ms:g}ms"
+        
+        if desired < current:
+            # Hysteresis: keep the current size unless the smaller one has headroom
+            if stats["concurrency"] > desired * target_concurrency * self.scale_down_headroom:
+                desired = current
+        
+        desired = min(max(desired, deployment.min_instances or 1), deployment.max_instances or desired)
+        if desired == current:
+            return None
+        
+        cooldown = self.scale_up_cooldown if desired > current else self.scale_down_cooldown
+        if deployment.last_scaled_at and now - deployment.last_scaled_at < cooldown:
+            return None
+        
+        return desired, reason
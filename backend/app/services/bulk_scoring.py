@@ -0,0 +1,132 @@
+import asyncio
+import csv
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+from app.responses import dumps
+
+# (row index, features or None, parse error or None)
+ParsedRow = Tuple[int, Optional[List[float]], Optional[str]]
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that can keep reading the request body while responding"""
+    
+    async def __call__(self, scope, receive, send):
+        # The default disconnect listener would consume the request body messages;
+        # a client that goes away surfaces as ClientDisconnect from request.stream()
+        await self.stream_response(send)
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without buffering more than one partial line"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+def _parse_ndjson(line: str) -> List[float]:
+    value = orjson.loads(line)
+    if isinstance(value, dict):
+        value = value["features"]
+    if not isinstance(value, list):
+        raise ValueError("Expected a JSON array or an object with 'features'")
+    return [float(x) for x in value]
+
+def _parse_csv(line: str) -> List[float]:
+    return [float(x) for x in next(csv.reader([line]))]
+
+async def iter_rows(chunks: AsyncIterator[bytes], content_type: str) -> AsyncIterator[ParsedRow]:
+    """Parse NDJSON or CSV rows incrementally; a CSV header line is skipped"""
+    is_csv = "csv" in (content_type or "")
+    parse = _parse_csv if is_csv else _parse_ndjson
+    index = 0
+    first = True
+    async for raw in iter_lines(chunks):
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        try:
+            row = parse(line)
+        except Exception as e:
+            if is_csv and first:
+                first = False
+                continue  # Header
+            yield index, None, f"Could not parse row: {e}"
+        else:
+            yield index, row, None
+        first = False
+        index += 1
+
+async def score_rows(
+    rows: AsyncIterator[ParsedRow],
+    score_batch: Callable[[List[List[float]]], Awaitable[Dict[str, Any]]],
+    chunk_rows: int = 1000,
+    max_in_flight: int = 4
+) -> AsyncIterator[bytes]:
+    """Score parsed rows in vectorized chunks and yield NDJSON results in input order.
+    
+    Up to `max_in_flight` chunks are scored concurrently (e.g. on different
+    replicas); memory stays bounded by chunk_rows * max_in_flight rows.
+    """
+    in_flight = deque()
+    
+    async def score(entries: List[ParsedRow]) -> Dict[str, Any]:
+        instances = [row for _, row, error in entries if error is None]
+        if not instances:
+            return {"predictions": [], "errors": []}
+        return await score_batch(instances)
+    
+    async def drain_one() -> bytes:
+        entries, task = in_flight.popleft()
+        try:
+            result, error = await task, None
+        except Exception as e:
+            result, error = None, str(e)
+        return _format_chunk(entries, result, error)
+    
+    entries: List[ParsedRow] = []
+    try:
+        async for entry in rows:
+            entries.append(entry)
+            # Unparseable rows count too, so a run of them can't grow the buffer unbounded
+            if len(entries) >= chunk_rows:
+                in_flight.append((entries, asyncio.ensure_future(score(entries))))
+                entries = []
+                if len(in_flight) >= max_in_flight:
+                    yield await drain_one()
+        if entries:
+            in_flight.append((entries, asyncio.ensure_future(score(entries))))
+        while in_flight:
+            yield await drain_one()
+    finally:
+        # The client went away or parsing failed, so stop any outstanding work
+        for _, task in in_flight:
+            task.cancel()
+
+def _format_chunk(entries: List[ParsedRow], result: Optional[Dict[str, Any]], error: Optional[str]) -> bytes:
+    lines = []
+    predictions = iter(result["predictions"]) if result else iter(())
+    row_errors = {}
+    if result:
+        # Upstream error indexes are relative to the rows we sent
+        row_errors = {e["index"]: e["error"] for e in result.get("errors", [])}
+    position = 0
+    for index, row, parse_error in entries:
+        if parse_error is not None:
+            lines.append({"index": index, "error": parse_error})
+            continue
+        if error is not None:
+            lines.append({"index": index, "error": error})
+        elif position in row_errors:
+            next(predictions)
+            lines.append({"index": index, "error": row_errors[position]})
+        else:
+            lines.append({"index": index, "prediction": next(predictions)})
+        position += 1
+    return b"".join(dumps(line) + b"\n" for line in lines)
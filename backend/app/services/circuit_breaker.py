@@ -0,0 +1,115 @@
+import math
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from app.metrics import CIRCUIT_BREAKER_TRANSITIONS
+
+# Outcomes of the most recent calls a replica's breaker judges it on
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20"))
+# Calls needed in the window before the breaker may open
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10"))
+# Share of failed or slow calls in the window that opens the breaker
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5"))
+# Calls slower than this count as failures
+CIRCUIT_BREAKER_SLOW_CALL_MS = float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_MS", "5000"))
+# How long an open breaker keeps traffic away before letting a probe through
+CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpen(Exception):
+    """Every healthy replica's breaker is open, so the request fails fast instead of waiting on them"""
+
+    status_code = 503
+
+    def __init__(self, retry_after: int):
+        self.detail = "All replicas are failing, retry later"
+        super().__init__(self.detail)
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one model server replica.
+
+    Closed: calls flow and their outcomes fill a sliding window. Once enough
+    of the window failed or was slow the breaker opens and the replica gets no
+    traffic for CIRCUIT_BREAKER_OPEN_SECONDS. It then goes half-open and lets
+    a single probe call through: success closes it, failure opens it again.
+    State is per gateway process, like the replicas' in-flight counters.
+    """
+
+    __slots__ = ("deployment_id", "state", "outcomes", "failures", "opened_at", "probing")
+
+    def __init__(self, deployment_id: int):
+        self.deployment_id = str(deployment_id)
+        self.state = CLOSED
+        self.outcomes: deque = deque(maxlen=CIRCUIT_BREAKER_WINDOW)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def available(self, now: float) -> bool:
+        """Whether a call may be sent to the replica now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= CIRCUIT_BREAKER_OPEN_SECONDS
+        return not self.probing
+
+    def retry_after(self, now: float) -> int:
+        """Seconds until the replica takes traffic again"""
+        return max(math.ceil(self.opened_at + CIRCUIT_BREAKER_OPEN_SECONDS - now), 1)
+
+    def try_acquire(self, now: float) -> Optional[bool]:
+        """Claim a call to the replica: None if it takes no traffic now, else whether the call is the half-open probe.
+
+        Checking and claiming in one step keeps two callers from both taking the probe.
+        """
+        if not self.available(now):
+            return None
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, failed: bool, probe: bool):
+        if probe:
+            self.probing = False
+            if failed:
+                self._open()
+            else:
+                self._transition(CLOSED)
+            return
+        if self.state != CLOSED:
+            # A straggler sent before the breaker opened
+            return
+        if len(self.outcomes) == self.outcomes.maxlen:
+            self.failures -= self.outcomes[0]
+        self.outcomes.append(failed)
+        self.failures += failed
+        if len(self.outcomes) >= CIRCUIT_BREAKER_MIN_CALLS and self.failures >= CIRCUIT_BREAKER_FAILURE_RATE * len(self.outcomes):
+            self._open()
+
+    def release(self, probe: bool):
+        """A call was abandoned before it said anything about the replica"""
+        if probe:
+            self.probing = False
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if state == CLOSED:
+            self.outcomes.clear()
+            self.failures = 0
+        self.state = state
+        CIRCUIT_BREAKER_TRANSITIONS.labels(self.deployment_id, state).inc()
+
+def is_slow(seconds: float) -> bool:
+    return seconds * 1000 >= CIRCUIT_BREAKER_SLOW_CALL_MS
@@ -3,10 +3,19 @@ import uuid
 import os
 from typing import Dict, Any
 
+from app.instrumentation import instrument_docker_client
+
 class ContainerService:
     def __init__(self):
-        self.client = docker.from_env()
+        self._client = None
         self.base_port = 8888
+    
+    @property
+    def client(self) -> docker.DockerClient:
+        """Docker connection, opened on first use"""
+        if self._client is None:
+            self._client = instrument_docker_client(docker.from_env())
+        return self._client
         
     def create_notebook_container(self, notebook_id: int, user_id: int, gpu_type: str, cpu_cores: int, memory_gb: int) -> Dict[str, Any]:
         """Create and start a Jupyter notebook container"""
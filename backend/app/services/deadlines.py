@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+# Time the caller will wait for an answer, in milliseconds. Relative rather
+# than absolute so clients, gateways and model servers needn't agree on clocks.
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before a model server answered"""
+
+    status_code = 504
+
+    def __init__(self, detail: str = "Deadline exceeded before the model server answered"):
+        super().__init__(detail)
+        self.detail = detail
+
+class ClientDisconnected(Exception):
+    """The caller went away before the prediction was ready"""
+
+    status_code = 499
+
+    def __init__(self):
+        self.detail = "Client closed the request"
+        super().__init__(self.detail)
+
+def remaining_seconds(deadline: float) -> float:
+    """Time left until a loop.time() deadline"""
+    return deadline - asyncio.get_running_loop().time()
+
+async def _wait_for_disconnect(receive: Callable[[], Awaitable[Dict[str, Any]]]):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def until_disconnected(receive: Callable[[], Awaitable[Dict[str, Any]]], work: Awaitable[Any]) -> Any:
+    """Await work, cancelling it if the client disconnects first.
+
+    Only for requests whose body has been read already: the next ASGI
+    message is then the disconnect, or nothing until the response is sent.
+    """
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        done, _ = await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            return task.result()
+        raise ClientDisconnected()
+    finally:
+        watcher.cancel()
+        task.cancel()
@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.models import Deployment
+from app.redis_client import ChannelListener, get_redis
+
+INVALIDATION_CHANNEL = "deployment-cache:invalidate"
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def publish_invalidation(deployment_id: int):
+    """Tell every API worker to drop its cached copy of a deployment"""
+    try:
+        get_redis().publish(INVALIDATION_CHANNEL, str(deployment_id))
+    except Exception as e:
+        # Other workers fall back to the TTL
+        print(f"Error publishing cache invalidation for deployment {deployment_id}: {e}")
+
+@dataclass
+class CachedDeployment:
+    """The slice of a Deployment row the predict path needs"""
+    id: int
+    status: str
+    api_key_hash: str
+    model_id: int
+    owner_id: int
+    pricing_tier: str
+    model_version: int
+    cache_enabled: bool
+    cache_backend: str
+    cache_ttl_seconds: int
+    cache_max_entries: int
+    cache_max_bytes: int
+    max_concurrency: int
+    max_queue: int
+    queue_timeout_ms: int
+    request_timeout_seconds: float
+    rollout_mode: Optional[str]
+    candidate_deployment_id: Optional[int]
+    candidate_weight: float
+    expires_at: float
+    
+    def check_api_key(self, api_key: Optional[str]) -> bool:
+        if not api_key:
+            return False
+        return hmac.compare_digest(hash_api_key(api_key), self.api_key_hash)
+
+class DeploymentCache:
+    """TTL + LRU cache of deployment routing and auth data, kept coherent across workers via Redis pub/sub"""
+    
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        self.max_entries = max_entries or int(os.getenv("DEPLOYMENT_CACHE_MAX_ENTRIES", "10000"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("DEPLOYMENT_CACHE_TTL_SECONDS", "30"))
+        self._entries: "OrderedDict[int, CachedDeployment]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Invalidations may have been missed while the listener was disconnected
+        self._listener = ChannelListener(
+            INVALIDATION_CHANNEL,
+            on_message=lambda data: self._evict(int(data)),
+            on_reset=self.clear
+        )
+    
+    def get(self, deployment_id: int) -> Optional[CachedDeployment]:
+        with self._lock:
+            entry = self._entries.get(deployment_id)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[deployment_id]
+                return None
+            self._entries.move_to_end(deployment_id)
+            return entry
+    
+    def put(self, deployment: Deployment) -> CachedDeployment:
+        entry = CachedDeployment(
+            id=deployment.id,
+            status=deployment.status,
+            api_key_hash=hash_api_key(deployment.api_key or ""),
+            model_id=deployment.model_id,
+            owner_id=deployment.owner_id,
+            pricing_tier=(deployment.owner.pricing_tier if deployment.owner else None) or "free",
+            model_version=deployment.model.version if deployment.model else 0,
+            cache_enabled=bool(deployment.cache_enabled),
+            cache_backend=deployment.cache_backend or "memory",
+            cache_ttl_seconds=deployment.cache_ttl_seconds or 300,
+            cache_max_entries=deployment.cache_max_entries or 10000,
+            cache_max_bytes=deployment.cache_max_bytes or 64 * 1024 * 1024,
+            max_concurrency=deployment.max_concurrency or 32,
+            max_queue=deployment.max_queue if deployment.max_queue is not None else 64,
+            queue_timeout_ms=deployment.queue_timeout_ms or 2000,
+            request_timeout_seconds=deployment.request_timeout_seconds or 30.0,
+            rollout_mode=deployment.rollout_mode,
+            candidate_deployment_id=deployment.candidate_deployment_id,
+            candidate_weight=deployment.candidate_weight or 0.0,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            self._entries[deployment.id] = entry
+            self._entries.move_to_end(deployment.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def invalidate(self, deployment_id: int):
+        """Drop a deployment locally and on every other worker"""
+        self._evict(deployment_id)
+        publish_invalidation(deployment_id)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def _evict(self, deployment_id: int):
+        with self._lock:
+            self._entries.pop(deployment_id, None)
+    
+    def start_listener(self):
+        """Start the background thread that applies invalidations from other workers"""
+        self._listener.start()
+    
+    def stop_listener(self):
+        self._listener.stop()
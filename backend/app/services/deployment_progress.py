@@ -0,0 +1,78 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Deployment
+from app.redis_client import get_async_redis, get_redis
+
+# Pipeline stages in order; "failed" can follow any of them
+STAGES = ("queued", "building", "starting", "warming", "ready")
+TERMINAL_STAGES = {"ready", "failed"}
+
+HEARTBEAT_SECONDS = 15
+
+def progress_channel(deployment_id: int) -> str:
+    return f"deployment-progress:{deployment_id}"
+
+def progress_event(deployment: Deployment) -> Dict[str, Any]:
+    """Snapshot of a deployment's pipeline progress"""
+    return {
+        "deployment_id": deployment.id,
+        "status": deployment.status,
+        "stage": deployment.stage,
+        "message": deployment.stage_message,
+        "updated_at": deployment.stage_updated_at.isoformat() if deployment.stage_updated_at else None
+    }
+
+def set_stage(db: Session, deployment: Deployment, stage: str, message: Optional[str] = None):
+    """Record a pipeline stage and notify anyone following the deployment"""
+    deployment.stage = stage
+    deployment.stage_message = message
+    deployment.stage_updated_at = datetime.utcnow()
+    if stage == "ready":
+        deployment.status = "running"
+    elif stage == "failed":
+        deployment.status = "failed"
+    db.commit()
+
+    try:
+        get_redis().publish(progress_channel(deployment.id), json.dumps(progress_event(deployment)))
+    except Exception as e:
+        # Pollers still see the stage in the database
+        print(f"Failed to publish progress for deployment {deployment.id}: {e}")
+
+def _format_event(event: Dict[str, Any]) -> bytes:
+    return f"event: progress\ndata: {json.dumps(event)}\n\n".encode()
+
+async def stream_progress(deployment_id: int, snapshot: Callable[[], Optional[Dict[str, Any]]]) -> AsyncIterator[bytes]:
+    """Server-sent events for a deployment's progress, ending once it is ready or failed.
+
+    Subscribes before taking the initial snapshot so no transition in between is missed.
+    """
+    pubsub = get_async_redis().pubsub()
+    await pubsub.subscribe(progress_channel(deployment_id))
+    try:
+        event = await asyncio.to_thread(snapshot)
+        if event is None:
+            return
+        yield _format_event(event)
+
+        idle = 0.0
+        while event["stage"] not in TERMINAL_STAGES:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                idle += 1.0
+                if idle >= HEARTBEAT_SECONDS:
+                    # Keep proxies from closing a quiet stream
+                    yield b": keep-alive\n\n"
+                    idle = 0.0
+                continue
+            idle = 0.0
+            event = json.loads(message["data"])
+            yield _format_event(event)
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
@@ -2,198 +2,1352 @@ import docker
 import json
 import os
 import asyncio
-from typing import Dict, Any
+import random
+import time
+import uuid
+from typing import Callable, Dict, Any, Optional, Tuple
 import requests
-from pathlib import Path
+import httpx
 
 from app.models import Model, Deployment
+from app.services.routing_table import RoutingTable
+from app.services.image_cache import ImageCache, IMAGE_BUILD_TIMEOUT
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpen, is_slow
+from app.services.hedging import HEDGE_LOST, HedgePolicy, LatencyWindow
+from app.services.deadlines import DEADLINE_HEADER, DeadlineExceeded
+from app.metrics import CIRCUIT_BREAKER_REJECTED, HEDGED_REQUESTS
+from app.redis_client import get_redis
+from app.instrumentation import instrument_docker_client
+
+# Shared serving runtime spliced into every generated model server. The
+# framework template must define `np` and `run_inference(features)` first.
+MODEL_SERVER_PRELUDE = '''
+import gc
+import os
+
+WORKERS = max(int(os.getenv("WORKERS", "1")), 1)
+
+def _available_cpus():
+    """CPUs this container may use, honouring cgroup quotas and cpusets"""
+    for path, parse in (
+        ("/sys/fs/cgroup/cpu.max", lambda text: text.split()),
+        ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", lambda text: [text.strip(), open("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read().strip()]),
+    ):
+        try:
+            quota, period = parse(open(path).read())
+            if quota not in ("max", "-1"):
+                return max(int(int(quota) / int(period)), 1)
+        except (OSError, ValueError):
+            continue
+    return len(os.sched_getaffinity(0))
+
+# Split the cores between worker processes before any math library starts its thread pool
+CPU_THREADS = max(_available_cpus() // WORKERS, 1)
+for _variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"):
+    os.environ.setdefault(_variable, str(CPU_THREADS))
+
+if WORKERS > 1:
+    # Avoid collections in the parent that would dirty pages shared with forked workers
+    gc.disable()
+'''
+
+MODEL_SERVER_RUNTIME = '''
+import asyncio
+import contextvars
+import csv
+from collections import Counter
+import glob
+import io
+import json
+import os
+import pickle
+import tempfile
+import time
+import uvicorn
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "false").lower() == "true"
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "5"))
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+MMAP_CACHE_DIR = os.getenv("MMAP_CACHE_DIR", "/model-cache")
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Remaining time the gateway will wait, in milliseconds
+DEADLINE_HEADER = b"x-request-timeout-ms"
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The caller stopped waiting before the request was scored"""
+
+class DeadlineMiddleware:
+    """Record when each request's caller stops waiting, from the gateway's deadline header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        deadline = None
+        for name, value in scope["headers"]:
+            if name == DEADLINE_HEADER:
+                try:
+                    deadline = time.monotonic() + float(value) / 1000.0
+                except ValueError:
+                    pass
+                break
+        token = request_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
+
+app.add_middleware(DeadlineMiddleware)
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request, exc):
+    return Response(content=b'{"detail": "Deadline passed before the request was scored"}', status_code=504, media_type="application/json")
+
+def expired(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+def _before_deadline(deadline, fn, *args):
+    # Runs once a threadpool thread is free, which is where requests queue under load
+    if expired(deadline):
+        raise DeadlineExceeded()
+    return fn(*args)
+
+async def run_before_deadline(fn, *args):
+    """Run fn in the threadpool unless the caller's deadline passes while it waits for a thread"""
+    return await run_in_threadpool(_before_deadline, request_deadline.get(), fn, *args)
+
+def dumps(content):
+    """Encode JSON with orjson when it's installed, NumPy arrays included"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=lambda value: value.tolist()).encode()
+
+def json_response(content):
+    """Pre-encoded JSON response, skipping FastAPI's encoder and response_model pass"""
+    return Response(content=dumps(content), media_type="application/json")
+
+def _load_plain(path):
+    try:
+        import joblib
+    except ImportError:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return joblib.load(path)
+
+def load_artifact(path, name=None):
+    """Load a pickled or joblib model, memory-mapping its NumPy arrays when possible.
+
+    The first process to load a file converts it to an uncompressed joblib copy in
+    the shared cache directory. Every process then maps that copy read-only, so all
+    workers and replicas on a host share one page-cached set of arrays.
+    """
+    try:
+        import joblib
+    except ImportError:
+        joblib = None
+    if joblib is None or not os.access(MMAP_CACHE_DIR, os.W_OK):
+        return _load_plain(path)
+
+    name = name or os.path.basename(path)
+    stat = os.stat(path)
+    converted = os.path.join(MMAP_CACHE_DIR, f"{name}-{stat.st_size}-{stat.st_mtime_ns}.joblib")
+    if not os.path.exists(converted):
+        # PIDs repeat across replica containers, so the temp name must be unique on its own
+        fd, temp = tempfile.mkstemp(dir=MMAP_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(_load_plain(path), temp)
+            # mkstemp creates the file owner-only; other replicas need to read it
+            os.chmod(temp, 0o644)
+            os.replace(temp, converted)
+        except BaseException:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise
+        # Conversions of earlier uploads of this model; mapped copies stay valid after unlink
+        for stale in glob.glob(os.path.join(MMAP_CACHE_DIR, f"{glob.escape(name)}-*.joblib")):
+            if stale != converted:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    return joblib.load(converted, mmap_mode="r")
+
+def serve(app, host="0.0.0.0", port=8000, fork_safe=True):
+    """Run the server, forking WORKERS processes that share the preloaded model copy-on-write"""
+    if WORKERS <= 1 or not fork_safe:
+        if WORKERS > 1:
+            print("This model runtime can't be forked after loading; running a single worker")
+        gc.enable()
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    import signal
+    import socket
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Everything loaded so far (the model included) is never scanned again, so
+    # the collector doesn't write to those pages in the children
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            gc.enable()
+            try:
+                uvicorn.Server(uvicorn.Config(app)).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(WORKERS):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting it")
+            spawn()
+
+def _resolve(future, result=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+class MicroBatcher:
+    """Coalesce concurrent requests into one vectorized inference call"""
+
+    def __init__(self, infer_fn, max_batch_size, max_wait_ms):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def submit(self, rows):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((rows, future, request_deadline.get()))
+        return await future
+
+    async def _collect(self):
+        item = await self.queue.get()
+        batch = [item]
+        size = len(item[0])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            # Only rows with the same trailing shape can be stacked together
+            groups = {}
+            for rows, future, deadline in batch:
+                groups.setdefault(rows.shape[1:], []).append((rows, future, deadline))
+            for group in groups.values():
+                await self._dispatch(group)
+
+    async def _dispatch(self, group):
+        # Requests whose caller gave up while they were queued aren't scored
+        live = []
+        for rows, future, deadline in group:
+            if expired(deadline):
+                _resolve(future, error=DeadlineExceeded())
+            elif not future.done():
+                live.append((rows, future))
+        if not live:
+            return
+        group = live
+        try:
+            stacked = np.concatenate([rows for rows, _ in group])
+            outputs = np.asarray(await run_in_threadpool(self.infer_fn, stacked))
+        except Exception:
+            # Re-run requests one by one so a bad input only fails its own caller
+            for rows, future in group:
+                try:
+                    result = await run_in_threadpool(self.infer_fn, rows)
+                except Exception as e:
+                    _resolve(future, error=e)
+                else:
+                    _resolve(future, np.asarray(result))
+            return
+        offset = 0
+        for rows, future in group:
+            _resolve(future, outputs[offset:offset + len(rows)])
+            offset += len(rows)
+
+batcher = MicroBatcher(run_inference, MAX_BATCH_SIZE, MAX_BATCH_WAIT_MS) if BATCHING_ENABLED else None
+
+@app.on_event("startup")
+async def start_batcher():
+    if batcher is not None:
+        batcher.start()
+
+async def infer(features):
+    """Run inference on a 2-D feature array, batching with concurrent requests if enabled"""
+    if batcher is not None:
+        return await batcher.submit(features)
+    return await run_before_deadline(run_inference, features)
+
+def _expected_width(instances, inference):
+    """Features per row: the model's own count when it records one, else the most common row width"""
+    estimator = getattr(inference, "__self__", None)
+    if estimator is None:
+        estimator = globals().get("model")
+    width = getattr(estimator, "n_features_in_", None)
+    if isinstance(width, (int, np.integer)):
+        return width
+    return Counter(len(row) for row in instances).most_common(1)[0][0]
+
+async def infer_rows(instances, inference=None):
+    """Score many rows with one vectorized call, reporting failures per row"""
+    inference = inference or run_inference
+    predictions = [None] * len(instances)
+    errors = []
+    width = _expected_width(instances, inference)
+    valid = []
+    for index, row in enumerate(instances):
+        if len(row) == width:
+            valid.append(index)
+        else:
+            errors.append({"index": index, "error": f"Expected {width} features, got {len(row)}"})
+    if not valid:
+        return predictions, errors
+    features = np.asarray([instances[index] for index in valid])
+    try:
+        outputs = np.asarray(await run_before_deadline(inference, features)).tolist()
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        # Fall back to row-at-a-time scoring to find which rows are bad
+        outputs = []
+        for position, index in enumerate(valid):
+            try:
+                result = await run_before_deadline(inference, features[position:position + 1])
+                outputs.append(np.asarray(result).tolist()[0])
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                outputs.append(None)
+                errors.append({"index": index, "error": str(e)})
+    for index, output in zip(valid, outputs):
+        predictions[index] = output
+    errors.sort(key=lambda error: error["index"])
+    return predictions, errors
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse that can keep reading the request body while responding"""
+
+    async def __call__(self, scope, receive, send):
+        # The default disconnect listener would consume the request body messages
+        await self.stream_response(send)
+
+def _decode_npy(body):
+    stream = io.BytesIO(body)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not supported")
+    # View the tensor in place rather than copying it out of the body
+    array = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=stream.tell())
+    return array.reshape(shape, order="F" if fortran_order else "C")
+
+def _encode_npy(array):
+    stream = io.BytesIO()
+    np.save(stream, array, allow_pickle=False)
+    return stream.getvalue()
+
+def _decode_arrow(body):
+    import pyarrow as pa
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    if table.num_columns == 1 and pa.types.is_fixed_size_list(table.schema.field(0).type):
+        # A single fixed-size list column maps onto a 2-D array without copying
+        column = table.column(0).combine_chunks()
+        return column.flatten().to_numpy().reshape(len(column), column.type.list_size)
+    return np.column_stack([column.to_numpy() for column in table.columns])
+
+def _encode_arrow(array):
+    import pyarrow as pa
+    values = np.ascontiguousarray(array).reshape(len(array), -1) if array.ndim > 1 else array
+    column = pa.array(values.reshape(-1))
+    if array.ndim > 1:
+        column = pa.FixedSizeListArray.from_arrays(column, values.shape[1])
+    table = pa.table({"prediction": column})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def _decode_msgpack(body):
+    import msgpack
+    payload = msgpack.unpackb(body, raw=False)
+    return np.frombuffer(payload["data"], dtype=np.dtype(payload["dtype"])).reshape(payload["shape"])
+
+def _encode_msgpack(array):
+    import msgpack
+    array = np.ascontiguousarray(array)
+    return msgpack.packb({"shape": list(array.shape), "dtype": array.dtype.str, "data": array.tobytes()})
+
+TENSOR_DECODERS = {
+    "application/x-npy": _decode_npy,
+    "application/vnd.apache.arrow.stream": _decode_arrow,
+    "application/x-msgpack": _decode_msgpack,
+}
+TENSOR_ENCODERS = {
+    "application/x-npy": _encode_npy,
+    "application/vnd.apache.arrow.stream": _encode_arrow,
+    "application/x-msgpack": _encode_msgpack,
+}
+
+def _tensor_media_type(header):
+    """Return the first binary tensor format named in a Content-Type or Accept header"""
+    for item in (header or "").split(","):
+        media_type = item.split(";")[0].strip().lower()
+        if media_type in TENSOR_DECODERS:
+            return media_type
+    return None
+
+async def read_features(request):
+    """Decode a predict body into a 2-D feature array based on its Content-Type"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+    media_type = _tensor_media_type(content_type)
+    if media_type is None and content_type and "json" not in content_type:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    try:
+        if media_type is None:
+            return np.asarray(json.loads(body)["features"]).reshape(1, -1)
+        features = TENSOR_DECODERS[media_type](body)
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=f"{media_type} is not available on this server: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not decode request body: {e}")
+    return features.reshape(1, -1) if features.ndim == 1 else features
+
+def render_prediction(request, prediction):
+    """Encode a prediction in the first binary format the client accepts, else as JSON"""
+    prediction = np.asarray(prediction)
+    media_type = _tensor_media_type(request.headers.get("accept"))
+    if media_type is not None and not prediction.dtype.hasobject:
+        try:
+            return Response(content=TENSOR_ENCODERS[media_type](prediction), media_type=media_type)
+        except ImportError:
+            pass
+    if orjson is not None and not prediction.dtype.hasobject:
+        try:
+            # Encoded straight from the array buffer, no Python lists in between
+            return json_response({"prediction": prediction})
+        except TypeError:
+            pass  # Layouts or dtypes orjson can't take natively
+    return json_response({"prediction": prediction.tolist()})
+
+def _parse_line(line, is_csv):
+    if is_csv:
+        return [float(x) for x in next(csv.reader([line]))]
+    value = json.loads(line)
+    if isinstance(value, dict):
+        value = value["features"]
+    return [float(x) for x in value]
+
+async def _score_chunk(entries):
+    """Score a chunk of (index, row, parse error) entries and render NDJSON lines"""
+    instances = [row for _, row, error in entries if error is None]
+    predictions, errors = await infer_rows(instances) if instances else ([], [])
+    row_errors = {error["index"]: error["error"] for error in errors}
+    lines = []
+    position = 0
+    for index, row, parse_error in entries:
+        if parse_error is not None:
+            lines.append({"index": index, "error": parse_error})
+            continue
+        if position in row_errors:
+            lines.append({"index": index, "error": row_errors[position]})
+        else:
+            lines.append({"index": index, "prediction": predictions[position]})
+        position += 1
+    return b"".join(dumps(line) + b"\\n" for line in lines)
+
+async def stream_predictions(chunks, content_type):
+    """Parse an NDJSON or CSV body incrementally and yield NDJSON results chunk by chunk"""
+    is_csv = "csv" in (content_type or "")
+    pending = b""
+    entries = []
+    index = 0
+    first = True
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\\n")
+        for raw in lines:
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            try:
+                entries.append((index, _parse_line(line, is_csv), None))
+            except Exception as e:
+                if is_csv and first:
+                    first = False
+                    continue  # Header
+                entries.append((index, None, f"Could not parse row: {e}"))
+            first = False
+            index += 1
+            if len(entries) >= STREAM_CHUNK_ROWS:
+                yield await _score_chunk(entries)
+                entries = []
+    line = pending.decode("utf-8", errors="replace").strip()
+    if line:
+        try:
+            entries.append((index, _parse_line(line, is_csv), None))
+        except Exception as e:
+            if not (is_csv and first):
+                entries.append((index, None, f"Could not parse row: {e}"))
+    if entries:
+        yield await _score_chunk(entries)
+'''
+
+# Binary tensor formats model servers accept besides JSON
+TENSOR_MEDIA_TYPES = {"application/x-npy", "application/vnd.apache.arrow.stream", "application/x-msgpack"}
+
+# Docker labels identifying model server replicas
+DEPLOYMENT_LABEL = "cloudburst.deployment_id"
+CLIENT_CONFIG_LABEL = "cloudburst.client_config"
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("REPLICA_HEALTH_CHECK_INTERVAL", "5"))
+
+# Shared multi-model pool: routed like a deployment under a reserved id
+SHARED_POOL_ID = 0
+SHARED_POOL_SIZE = int(os.getenv("SHARED_POOL_SIZE", "2"))
+SHARED_POOL_MEMORY_BUDGET_MB = int(os.getenv("SHARED_POOL_MEMORY_BUDGET_MB", "2048"))
+SHARED_POOL_WORKERS = int(os.getenv("SHARED_POOL_WORKERS", "1"))
+SHARED_POOL_REQUIREMENTS = os.getenv("SHARED_POOL_REQUIREMENTS", "fastapi,uvicorn,numpy,msgpack,orjson,scikit-learn,joblib").split(",")
+MODEL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "./storage/models")
+# Host directory where model servers keep memory-mappable copies of pickled models
+MMAP_CACHE_PATH = os.getenv("MMAP_CACHE_PATH", "./storage/mmap-cache")
+
+# Address other API hosts use to reach containers started by this process
+DEPLOYMENT_HOST = os.getenv("DEPLOYMENT_HOST", "localhost")
 
 class DeploymentService:
     def __init__(self):
-        self.client = docker.from_env()
-        self.base_port = 9000
-        self.deployments = {}  # In-memory deployment tracking
+        self._client: Optional[docker.DockerClient] = None
+        self._image_cache: Optional[ImageCache] = None
+        self.routing_table = RoutingTable()
+        self.deployments = {}  # Local read-through copy of the routing table
+        self.clients: Dict[int, httpx.AsyncClient] = {}  # Pooled upstream clients per deployment
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stale = set()  # Deployments changed by another worker since we last read them
+        self._route_listener = self.routing_table.listener(self._mark_stale, self._mark_all_stale)
+    
+    @property
+    def client(self) -> docker.DockerClient:
+        """Docker connection, opened on first use so API workers that only route predictions don't need a daemon"""
+        if self._client is None:
+            self._client = instrument_docker_client(docker.from_env())
+        return self._client
+    
+    @property
+    def image_cache(self) -> ImageCache:
+        if self._image_cache is None:
+            self._image_cache = ImageCache(self.client)
+        return self._image_cache
+        
+    def deploy_model(self, deployment_id: int, model: Model, deployment_config, on_stage: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Deploy a model as a containerized service, reporting pipeline stages to on_stage"""
         
-    def deploy_model(self, deployment_id: int, model: Model, deployment_config) -> Dict[str, Any]:
-        """Deploy a model as a containerized service"""
+        on_stage = on_stage or (lambda stage, message: None)
         
-        port = self.base_port + deployment_id
-        container_name = f"deployment-{deployment_id}"
+        if getattr(deployment_config, "serving_mode", None) == "shared":
+            return self._deploy_shared(deployment_id, model, on_stage)
         
-        # Create deployment container based on model type
+        # Pick the server template based on model type
         if model.model_type in ["sklearn", "joblib"]:
             image = "python:3.10-slim"
-            app_code = self._generate_sklearn_app(model)
+            app_code = self._generate_sklearn_app()
+            model_filename = "model.pkl"
         elif model.model_type in ["pytorch", "torch"]:
             image = "pytorch/pytorch:latest"
-            app_code = self._generate_pytorch_app(model)
+            app_code = self._generate_pytorch_app()
+            model_filename = "model.pt"
         elif model.model_type in ["tensorflow", "keras"]:
             image = "tensorflow/tensorflow:latest-gpu" if deployment_config.instance_type.startswith("gpu") else "tensorflow/tensorflow:latest"
-            app_code = self._generate_tensorflow_app(model)
+            app_code = self._generate_tensorflow_app()
+            model_filename = "model.h5"
+        elif model.model_type == "onnx":
+            image = "python:3.10-slim"
+            app_code = self._generate_onnx_app()
+            model_filename = "model.onnx"
         else:
             raise Exception(f"Unsupported model type: {model.model_type}")
         
-        # Create temporary directory with app code
-        temp_dir = Path(f"/tmp/deployment-{deployment_id}")
-        temp_dir.mkdir(exist_ok=True)
-        
-        # Write app code
-        with open(temp_dir / "app.py", "w") as f:
-            f.write(app_code)
-        
-        # Write requirements
-        requirements = model.requirements or ["fastapi", "uvicorn", "numpy"]
-        with open(temp_dir / "requirements.txt", "w") as f:
-            f.write("\n".join(requirements))
-        
-        # Write Dockerfile
-        dockerfile_content = self._generate_dockerfile(image, model.model_type)
-        with open(temp_dir / "Dockerfile", "w") as f:
-            f.write(dockerfile_content)
+        requirements = list(model.requirements or ["fastapi", "uvicorn", "numpy", "msgpack", "orjson"])
+        if model.model_type == "onnx" and not any(r.startswith("onnxruntime") for r in requirements):
+            requirements.append("onnxruntime")
+        if model.model_type in ["sklearn", "joblib"] and not any(r.startswith("joblib") for r in requirements):
+            requirements.append("joblib")
         
         try:
-            # Build custom image
-            image_tag = f"deployment-{deployment_id}:latest"
-            self.client.images.build(
-                path=str(temp_dir),
-                tag=image_tag,
-                rm=True
-            )
-            
-            # Run container
-            container = self.client.containers.run(
-                image_tag,
-                name=container_name,
-                ports={8000: port},
-                detach=True,
-                restart_policy={"Name": "unless-stopped"},
-                environment={
-                    "MODEL_PATH": model.model_path,
-                    "MODEL_TYPE": model.model_type
+            # Reuse a cached image for this template and requirement set, building it on a miss
+            on_stage("building", "Preparing model server image")
+            image_tag = self.image_cache.get_or_build(
+                image,
+                model.model_type,
+                requirements,
+                {
+                    "app.py": app_code,
+                    "Dockerfile": self._generate_dockerfile(image, model.model_type)
                 }
             )
             
             # Store deployment info
             self.deployments[deployment_id] = {
-                "container_id": container.id,
-                "port": port,
-                "status": "running"
+                "image": image_tag,
+                "environment": {
+                    "MODEL_NAME": model.name,
+                    "MODEL_PATH": model.model_path,
+                    "MODEL_TYPE": model.model_type,
+                    "WORKERS": str(getattr(deployment_config, "workers", None) or 1),
+                    **self._batching_env(deployment_config)
+                },
+                "volumes": self._model_volumes(model, model_filename),
+                "client_config": self._client_config(deployment_config),
+                "replicas": {}
             }
             
-            # Wait for container to be ready
-            self._wait_for_container_ready(f"http://localhost:{port}/health", timeout=60)
+            # Start the initial replicas and wait for them to be ready
+            replica_count = max(deployment_config.min_instances or 1, 1)
+            on_stage("starting", f"Starting {replica_count} replica(s)")
+            replicas = [
+                self._start_replica(deployment_id, on_stage)
+                for _ in range(replica_count)
+            ]
             
             return {
-                "container_id": container.id,
-                "endpoint_url": f"http://localhost:{port}",
+                "container_id": replicas[0]["container_id"],
+                "endpoint_url": f"http://{DEPLOYMENT_HOST}:{replicas[0]['port']}",
+                "replicas": len(replicas),
                 "status": "running"
             }
             
         except Exception as e:
+            self.stop_deployment(deployment_id)
             raise Exception(f"Failed to deploy model: {str(e)}")
+    
+    def _deploy_shared(self, deployment_id: int, model: Model, on_stage: Callable[[str, str], None]) -> Dict[str, Any]:
+        """Serve a model from the shared multi-model pool instead of its own containers"""
         
-        finally:
-            # Clean up temp directory
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        if model.model_type not in ["sklearn", "joblib"]:
+            raise Exception("Shared serving supports sklearn models only")
+        if not model.model_path or os.path.dirname(os.path.abspath(model.model_path)) != os.path.abspath(MODEL_STORAGE_PATH):
+            raise Exception("Shared serving needs a model kept in local storage")
+        
+        on_stage("starting", "Making sure the shared model server pool is running")
+        pool = self._ensure_shared_pool()
+        
+        # Load the model once up front so a broken file fails the deploy, not the first request
+        model_file = os.path.basename(model.model_path)
+        replica = next(iter(pool["replicas"].values()))
+        on_stage("warming", "Loading the model into the shared pool")
+        try:
+            response = requests.post(
+                f"http://{replica['host']}:{replica['port']}/models/{deployment_id}/load",
+                headers={"X-Model-File": model_file},
+                timeout=120
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise Exception(f"Failed to load model into the shared pool: {str(e)}")
+        
+        self.routing_table.put_shared(deployment_id, SHARED_POOL_ID, model_file)
+        return {
+            "container_id": None,
+            "endpoint_url": f"http://{replica['host']}:{replica['port']}/models/{deployment_id}",
+            "replicas": 0,
+            "status": "running"
+        }
+    
+    def _ensure_shared_pool(self) -> Dict[str, Any]:
+        """Start the shared multi-model pool on this host if it isn't running yet"""
+        
+        with get_redis().lock("shared-pool:start", timeout=IMAGE_BUILD_TIMEOUT, blocking_timeout=IMAGE_BUILD_TIMEOUT):
+            self.refresh_from_docker(SHARED_POOL_ID)
+            pool = self.deployments.get(SHARED_POOL_ID)
+            if pool and pool["replicas"]:
+                return pool
+            
+            image = "python:3.10-slim"
+            image_tag = self.image_cache.get_or_build(
+                image,
+                "sklearn-multi-model",
+                SHARED_POOL_REQUIREMENTS,
+                {
+                    "app.py": self._generate_multi_model_app(),
+                    "Dockerfile": self._generate_dockerfile(image, "sklearn")
+                }
+            )
+            self.deployments[SHARED_POOL_ID] = {
+                "image": image_tag,
+                "environment": {
+                    "MODEL_MEMORY_BUDGET_MB": str(SHARED_POOL_MEMORY_BUDGET_MB),
+                    "WORKERS": str(SHARED_POOL_WORKERS)
+                },
+                "volumes": {
+                    os.path.abspath(MODEL_STORAGE_PATH): {"bind": "/models", "mode": "ro"},
+                    **self._mmap_cache_volume()
+                },
+                "client_config": {"max_connections": 200, "max_keepalive": 50, "timeout": 30.0, "http2": False},
+                "replicas": {}
+            }
+            for _ in range(SHARED_POOL_SIZE):
+                self._start_replica(SHARED_POOL_ID)
+            return self.deployments[SHARED_POOL_ID]
+    
+    def _unload_shared(self, deployment_id: int):
+        """Ask every shared pool replica to drop a model; they would evict it eventually anyway"""
+        pool = self.routing_table.get(SHARED_POOL_ID)
+        for replica in (pool or {"replicas": {}})["replicas"].values():
+            try:
+                requests.delete(f"http://{replica['host']}:{replica['port']}/models/{deployment_id}", timeout=5)
+            except requests.RequestException:
+                pass
     
-    async def predict(self, deployment_id: int, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def predict(self, deployment_id: int, input_data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
         """Make prediction using deployed model"""
+        return await self._post(deployment_id, "/predict", input_data, deadline)
+    
+    async def predict_batch(self, deployment_id: int, input_data: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Score many rows with a single call to the deployed model"""
+        return await self._post(deployment_id, "/predict/batch", input_data, deadline)
+    
+    async def predict_raw(self, deployment_id: int, body: bytes, content_type: str, accept: Optional[str] = None, deadline: Optional[float] = None) -> Tuple[bytes, str]:
+        """Forward an encoded predict body untouched and return the encoded response"""
+        headers = {"Content-Type": content_type}
+        if accept:
+            headers["Accept"] = accept
+        response = await self._send(deployment_id, "/predict", deadline, content=body, headers=headers)
+        return response.content, response.headers.get("content-type", "application/json")
+    
+    async def _post(self, deployment_id: int, path: str, payload: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """POST a JSON payload to one of a deployment's replicas"""
+        response = await self._send(deployment_id, path, deadline, json=payload)
+        return response.json()
+    
+    async def _send(self, deployment_id: int, path: str, deadline: Optional[float] = None, **request_kwargs) -> httpx.Response:
+        """POST to one of a deployment's replicas, hedging single predictions when the deployment allows it.
         
-        deployment_info = self.deployments.get(deployment_id)
+        deadline is the loop.time() by which the response is due. It bounds the
+        upstream timeout and is passed on so the model server can skip work the
+        caller will no longer wait for.
+        """
+        
+        deployment_info = await self._resolve(deployment_id)
         if not deployment_info:
             raise Exception("Deployment not found")
         
-        port = deployment_info["port"]
+        shared = deployment_info.get("shared")
+        if shared:
+            # Models in the shared pool are addressed by deployment id on the pool's replicas
+            path = f"/models/{deployment_id}{path}"
+            request_kwargs["headers"] = {**request_kwargs.get("headers", {}), "X-Model-File": shared["model_file"]}
+            deployment_id = shared["pool"]
+            deployment_info = await self._resolve(deployment_id)
+            if not deployment_info:
+                raise Exception("Shared model server pool is not running")
+        
+        client = self._get_client(deployment_id, deployment_info)
+        
+        # Batches are too expensive to send twice, so only single predictions are hedged
+        policy = None
+        if path == "/predict" and (deployment_info.get("client_config") or {}).get("hedging"):
+            policy = deployment_info.get("hedge_policy")
+            if policy is None:
+                policy = deployment_info["hedge_policy"] = HedgePolicy()
+        delay = policy.hedge_delay(r["latency"] for r in list(deployment_info["replicas"].values()) if r["healthy"]) if policy else None
+        if delay is None:
+            return await self._attempt(deployment_id, deployment_info, client, path, request_kwargs, deadline, policy)
+        return await self._hedged(deployment_id, deployment_info, client, path, request_kwargs, deadline, policy, delay)
+    
+    async def _hedged(self, deployment_id: int, deployment_info: Dict[str, Any], client: httpx.AsyncClient, path: str, request_kwargs: Dict[str, Any], deadline: Optional[float], policy: HedgePolicy, delay: float) -> httpx.Response:
+        """Send to one replica, and to a second one if the first hasn't answered within delay; the first answer wins"""
         
+        # Each attempt task starts before this coroutine next yields, so its call
+        # owns the replica's breaker claim by the time anything can cancel it
+        first, probe = self._pick_replica(deployment_info)
+        primary = asyncio.ensure_future(self._attempt(deployment_id, deployment_info, client, path, request_kwargs, deadline, policy, first, probe))
+        tasks = [primary]
+        backup = None
         try:
-            response = requests.post(
-                f"http://localhost:{port}/predict",
-                json=input_data,
-                timeout=30
-            )
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return primary.result()
+            try:
+                second, probe = self._pick_replica(deployment_info, exclude=first)
+            except Exception:
+                # No other replica to try
+                return await primary
+            
+            policy.spend()
+            HEDGED_REQUESTS.labels(str(deployment_id), "sent").inc()
+            backup = asyncio.ensure_future(self._attempt(deployment_id, deployment_info, client, path, request_kwargs, deadline, policy, second, probe))
+            tasks.append(backup)
+            
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            HEDGED_REQUESTS.labels(str(deployment_id), "won").inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing call, or both if the caller went away. A primary beaten by its
+            # backup despite the head start is marked, so its replica is judged slow.
+            lost = backup is not None and backup.done() and not backup.cancelled() and backup.exception() is None
+            for task in tasks:
+                task.cancel(HEDGE_LOST if lost and task is primary else None)
+    
+    async def _attempt(self, deployment_id: int, deployment_info: Dict[str, Any], client: httpx.AsyncClient, path: str, request_kwargs: Dict[str, Any], deadline: Optional[float] = None, policy: Optional[HedgePolicy] = None, replica: Optional[Dict[str, Any]] = None, probe: bool = False) -> httpx.Response:
+        """POST to a replica, retrying once on another if the connection is refused.
+        
+        A replica passed in comes already claimed from its breaker by _pick_replica.
+        """
+        
+        # A refused connection never reached the model, so it is safe to retry elsewhere
+        for attempt in range(2):
+            if replica is None:
+                replica, probe = self._pick_replica(deployment_info)
+            try:
+                return await self._call_replica(client, replica, probe, path, request_kwargs, deadline, policy)
+            
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                await self._mark_unhealthy(deployment_id, replica)
+                if attempt == 1:
+                    raise Exception(f"Prediction request failed: {str(e)}")
+                replica = None
+            
+            except httpx.HTTPError as e:
+                raise Exception(f"Prediction request failed: {str(e)}")
+    
+    async def _call_replica(self, client: httpx.AsyncClient, replica: Dict[str, Any], probe: bool, path: str, request_kwargs: Dict[str, Any], deadline: Optional[float], policy: Optional[HedgePolicy]) -> httpx.Response:
+        """One POST to one replica, with its outcome recorded by the replica's circuit breaker"""
+        
+        breaker = replica["breaker"]
+        loop = asyncio.get_running_loop()
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                breaker.release(probe)
+                raise DeadlineExceeded()
+            headers = {**request_kwargs.get("headers", {}), DEADLINE_HEADER: str(max(int(remaining * 1000), 1))}
+            request_kwargs = {**request_kwargs, "headers": headers}
+            if remaining < client.timeout.read:
+                # Only a backstop: httpx applies it to each phase, not the whole call
+                request_kwargs["timeout"] = httpx.Timeout(remaining, connect=min(remaining, 5.0))
+        
+        replica["outstanding"] += 1
+        started = time.monotonic()
+        failed = True
+        try:
+            # The deadline bounds the whole call: pool wait, connect, write and read together
+            response = await asyncio.wait_for(client.post(
+                f"http://{replica['host']}:{replica['port']}{path}",
+                **request_kwargs
+            ), remaining)
+            if response.status_code == 504 and deadline is not None:
+                # The model server dropped it unscored because the deadline passed while it was queued
+                failed = None
+                raise DeadlineExceeded()
+            # Rejected input is the caller's problem, not the replica's
+            failed = response.status_code >= 500
             response.raise_for_status()
-            return response.json()
+            return response
+        
+        except asyncio.TimeoutError:
+            # Only raised by wait_for, so the caller's budget ran out
+            failed = None
+            raise DeadlineExceeded()
+        
+        except httpx.TimeoutException:
+            if deadline is not None and deadline - loop.time() < 0.01:
+                # The caller's budget ran out, which says nothing about the replica unless it was slow
+                failed = None
+                raise DeadlineExceeded()
+            raise
         
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Prediction request failed: {str(e)}")
+        except asyncio.CancelledError as e:
+            # A primary a hedge beat counts as slow, so a hung replica that keeps losing
+            # races is held against it. Otherwise the caller went away or this was the
+            # backup, and only an already slow call says something about the replica.
+            failed = True if e.args and e.args[0] == HEDGE_LOST else None
+            raise
+        
+        finally:
+            replica["outstanding"] -= 1
+            elapsed = time.monotonic() - started
+            if failed is None and not is_slow(elapsed):
+                breaker.release(probe)
+            else:
+                breaker.record(bool(failed) or is_slow(elapsed), probe)
+            if failed is False and policy is not None:
+                replica["latency"].observe(elapsed)
     
-    def scale_deployment(self, deployment_id: int, scale_config: Dict[str, Any]):
-        """Scale deployment (placeholder for Kubernetes integration)"""
-        # In a real implementation, this would interact with Kubernetes
-        # to scale the deployment based on the configuration
-        pass
+    async def _resolve(self, deployment_id: int) -> Optional[Dict[str, Any]]:
+        """Read-through lookup of a deployment's replicas in the shared routing table"""
+        if deployment_id in self._stale or deployment_id not in self.deployments:
+            self._stale.discard(deployment_id)
+            route = await self.routing_table.fetch(deployment_id)
+            self._apply_route(deployment_id, route)
+        return self.deployments.get(deployment_id)
     
-    def stop_deployment(self, deployment_id: int):
-        """Stop and remove deployment"""
+    def _apply_route(self, deployment_id: int, route: Optional[Dict[str, Any]]):
+        """Merge a routing table entry into the local registry, keeping in-flight counters"""
+        if route is None:
+            # Deployments this process is still building keep their entry
+            if "image" not in self.deployments.get(deployment_id, {}):
+                self.deployments.pop(deployment_id, None)
+            return
+        
+        deployment_info = self.deployments.setdefault(deployment_id, {"replicas": {}})
+        deployment_info["client_config"] = route["client_config"]
+        deployment_info["shared"] = route.get("shared")
+        current = deployment_info["replicas"]
+        replicas = {}
+        for container_id, entry in route["replicas"].items():
+            replica = current.get(container_id) or self._replica_entry(deployment_id, container_id, entry["host"], entry["port"])
+            replica["healthy"] = entry["healthy"]
+            replicas[container_id] = replica
+        deployment_info["replicas"] = replicas
+    
+    def _mark_stale(self, deployment_id: int):
+        self._stale.add(deployment_id)
+    
+    def _mark_all_stale(self):
+        self._stale.update(self.deployments.keys())
+    
+    async def _mark_unhealthy(self, deployment_id: int, replica: Dict[str, Any]):
+        replica["healthy"] = False
+        try:
+            await self.routing_table.set_health(deployment_id, replica["container_id"], False)
+        except Exception as e:
+            print(f"Error recording unhealthy replica {replica['container_id']}: {e}")
+    
+    def _pick_replica(self, deployment_info: Dict[str, Any], exclude: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """Power-of-two-choices: sample two healthy replicas with closed breakers, use the less loaded one.
         
+        The pick is claimed from the replica's breaker in the same step, so only one
+        call can become a half-open replica's probe. Returns the replica and whether
+        the call is its probe; the probe must be recorded or released.
+        """
+        healthy = [r for r in list(deployment_info["replicas"].values()) if r["healthy"] and r is not exclude]
+        if not healthy:
+            raise Exception("No healthy replicas available")
+        now = time.monotonic()
+        available = [r for r in healthy if r["breaker"].available(now)]
+        if not available:
+            CIRCUIT_BREAKER_REJECTED.labels(healthy[0]["breaker"].deployment_id).inc()
+            raise CircuitOpen(min(r["breaker"].retry_after(now) for r in healthy))
+        if len(available) == 1:
+            replica = available[0]
+        else:
+            first, second = random.sample(available, 2)
+            replica = first if first["outstanding"] <= second["outstanding"] else second
+        return replica, replica["breaker"].try_acquire(now)
+    
+    def start_route_listener(self):
+        """Follow routing table changes made by other workers"""
+        self._route_listener.start()
+    
+    def stop_route_listener(self):
+        self._route_listener.stop()
+    
+    async def aclose(self):
+        """Close all pooled upstream clients"""
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            await client.aclose()
+    
+    def scale_deployment(self, deployment_id: int, scale_config: Dict[str, Any]) -> int:
+        """Start or stop replica containers until the deployment has scale_config["replicas"]"""
+        
+        self.refresh_from_docker(deployment_id)
         deployment_info = self.deployments.get(deployment_id)
-        if deployment_info:
+        if not deployment_info or not deployment_info["replicas"]:
+            raise Exception("Deployment not found")
+        
+        replicas = list(deployment_info["replicas"].values())
+        desired = scale_config.get("replicas", len(replicas))
+        if desired < 1:
+            raise Exception("A deployment needs at least one replica")
+        
+        for _ in range(desired - len(replicas)):
+            self._start_replica(deployment_id)
+        
+        # Retire unhealthy replicas first, then the least busy ones
+        surplus = sorted(replicas, key=lambda r: (r["healthy"], r["outstanding"]))[:max(len(replicas) - desired, 0)]
+        for replica in surplus:
+            self._stop_replica(deployment_id, replica["container_id"])
+        
+        return len(deployment_info["replicas"])
+    
+    def stop_deployment(self, deployment_id: int):
+        """Stop and remove every replica of a deployment"""
+        
+        containers = self.client.containers.list(
+            all=True,
+            filters={"label": f"{DEPLOYMENT_LABEL}={deployment_id}"}
+        )
+        for container in containers:
             try:
-                container = self.client.containers.get(deployment_info["container_id"])
                 container.stop()
                 container.remove()
-                del self.deployments[deployment_id]
             except Exception:
                 pass
+        if (self.routing_table.get(deployment_id) or {}).get("shared"):
+            self._unload_shared(deployment_id)
+        self.deployments.pop(deployment_id, None)
+        self.routing_table.remove_deployment(deployment_id)
+        
+        client = self.clients.pop(deployment_id, None)
+        if client is not None:
+            self._retire_client(client)
+    
+    def refresh_from_docker(self, deployment_id: int):
+        """Rebuild a deployment's replicas on this Docker host from labelled containers.
+        
+        Replicas may have been started or removed by another process, so Docker is
+        the source of truth. The routing table is corrected to match.
+        """
+        containers = {}
+        client_config = {}
+        for container in self.client.containers.list(filters={"label": f"{DEPLOYMENT_LABEL}={deployment_id}"}):
+            host_ports = container.ports.get("8000/tcp") or [{}]
+            if host_ports[0].get("HostPort"):
+                containers[container.id] = int(host_ports[0]["HostPort"])
+                client_config = json.loads(container.labels.get(CLIENT_CONFIG_LABEL, "{}"))
+        
+        route = self.routing_table.get(deployment_id) or {"client_config": client_config, "replicas": {}}
+        for container_id, entry in route["replicas"].items():
+            if entry["host"] == DEPLOYMENT_HOST and container_id not in containers:
+                self.routing_table.remove_replica(deployment_id, container_id)
+                del route["replicas"][container_id]
+        for container_id, port in containers.items():
+            if container_id not in route["replicas"]:
+                self.routing_table.put_replica(deployment_id, container_id, DEPLOYMENT_HOST, port, client_config)
+                route["replicas"][container_id] = {"host": DEPLOYMENT_HOST, "port": port, "healthy": True}
+        
+        self._apply_route(deployment_id, route if route["replicas"] else None)
+    
+    async def sync_routes(self):
+        """Refresh the local registry from the shared routing table"""
+        routes = await self.routing_table.fetch_all()
+        for deployment_id in set(self.deployments) | set(routes):
+            self._apply_route(deployment_id, routes.get(deployment_id))
+        self._stale.difference_update(routes)
     
-    def _generate_sklearn_app(self, model: Model) -> str:
+    async def check_health(self):
+        """Probe every replica's /health and take failing ones out of rotation"""
+        
+        async def probe(deployment_id: int, client: httpx.AsyncClient, replica: Dict[str, Any]):
+            try:
+                response = await client.get(f"http://{replica['host']}:{replica['port']}/health", timeout=2.0)
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if healthy != replica["healthy"]:
+                replica["healthy"] = healthy
+                await self.routing_table.set_health(deployment_id, replica["container_id"], healthy)
+        
+        probes = []
+        for deployment_id, deployment_info in list(self.deployments.items()):
+            if not deployment_info["replicas"]:
+                continue
+            client = self._get_client(deployment_id, deployment_info)
+            probes.extend(probe(deployment_id, client, replica) for replica in list(deployment_info["replicas"].values()))
+        await asyncio.gather(*probes)
+    
+    async def run_health_checks(self, interval: float = HEALTH_CHECK_INTERVAL):
+        """Background loop keeping the replica registry and health flags current"""
+        while True:
+            try:
+                await self.sync_routes()
+                await self.check_health()
+            except Exception as e:
+                print(f"Replica health check failed: {e}")
+            await asyncio.sleep(interval)
+    
+    def _replica_entry(self, deployment_id: int, container_id: str, host: str, port: int) -> Dict[str, Any]:
+        return {
+            "container_id": container_id,
+            "host": host,
+            "port": port,
+            "healthy": True,
+            "outstanding": 0,
+            "breaker": CircuitBreaker(deployment_id),
+            "latency": LatencyWindow()
+        }
+    
+    def _start_replica(self, deployment_id: int, on_stage: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """Start one more model server container and wait until it is healthy"""
+        
+        deployment_info = self.deployments[deployment_id]
+        image, environment, volumes = deployment_info.get("image"), deployment_info.get("environment"), deployment_info.get("volumes")
+        if image is None:
+            # Registry was rebuilt from Docker, so clone an existing replica
+            template = self.client.containers.get(next(iter(deployment_info["replicas"])))
+            image = template.attrs["Config"]["Image"]
+            environment = template.attrs["Config"]["Env"]
+            volumes = template.attrs["HostConfig"].get("Binds")
+        
+        container = self.client.containers.run(
+            image,
+            name=f"deployment-{deployment_id}-{uuid.uuid4().hex[:8]}",
+            ports={"8000/tcp": None},  # Let Docker pick a free host port
+            detach=True,
+            restart_policy={"Name": "unless-stopped"},
+            environment=environment,
+            volumes=volumes,
+            labels={
+                DEPLOYMENT_LABEL: str(deployment_id),
+                CLIENT_CONFIG_LABEL: json.dumps(deployment_info["client_config"])
+            }
+        )
+        container.reload()
+        port = int(container.ports["8000/tcp"][0]["HostPort"])
+        
+        if on_stage is not None:
+            on_stage("warming", f"Waiting for replica {container.short_id} to load the model")
+        try:
+            self._wait_for_container_ready(f"http://{DEPLOYMENT_HOST}:{port}/health", timeout=60)
+        except Exception:
+            container.remove(force=True)
+            raise
+        
+        replica = self._replica_entry(deployment_id, container.id, DEPLOYMENT_HOST, port)
+        deployment_info["replicas"][container.id] = replica
+        self.routing_table.put_replica(deployment_id, container.id, DEPLOYMENT_HOST, port, deployment_info["client_config"])
+        return replica
+    
+    def _stop_replica(self, deployment_id: int, container_id: str):
+        replicas = self.deployments[deployment_id]["replicas"]
+        # Take it out of rotation before stopping so no new requests are routed to it
+        replicas.pop(container_id, None)
+        self.routing_table.remove_replica(deployment_id, container_id)
+        try:
+            container = self.client.containers.get(container_id)
+            container.stop()
+            container.remove()
+        except Exception:
+            pass
+    
+    def _model_volumes(self, model: Model, model_filename: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """Bind-mount a locally stored model file read-only where the server template loads it"""
+        if not model.model_path or model.model_path.startswith("s3://"):
+            return None
+        volumes = {
+            os.path.abspath(model.model_path): {"bind": f"/model/{model_filename}", "mode": "ro"}
+        }
+        if model.model_type in ["sklearn", "joblib"]:
+            volumes.update(self._mmap_cache_volume())
+        return volumes
+    
+    def _mmap_cache_volume(self) -> Dict[str, Dict[str, str]]:
+        """Shared writable directory for memory-mappable model copies"""
+        os.makedirs(MMAP_CACHE_PATH, exist_ok=True)
+        return {os.path.abspath(MMAP_CACHE_PATH): {"bind": "/model-cache", "mode": "rw"}}
+    
+    def _batching_env(self, deployment_config) -> Dict[str, str]:
+        """Container environment controlling the model server's micro-batcher"""
+        return {
+            "BATCHING_ENABLED": "true" if deployment_config.batching_enabled else "false",
+            "MAX_BATCH_SIZE": str(deployment_config.max_batch_size or 32),
+            "MAX_BATCH_WAIT_MS": str(deployment_config.max_batch_wait_ms or 5.0)
+        }
+    
+    def _client_config(self, deployment_config) -> Dict[str, Any]:
+        """Extract upstream connection pool settings from a deployment config"""
+        return {
+            "max_connections": deployment_config.pool_max_connections or 100,
+            "max_keepalive": deployment_config.pool_max_keepalive or 20,
+            "timeout": deployment_config.request_timeout_seconds or 30.0,
+            "http2": bool(deployment_config.http2),
+            "hedging": bool(deployment_config.hedging_enabled)
+        }
+    
+    def _get_client(self, deployment_id: int, deployment_info: Dict[str, Any]) -> httpx.AsyncClient:
+        """Return the keep-alive client for a deployment, creating it on first use"""
+        client = self.clients.get(deployment_id)
+        if client is None:
+            config = deployment_info.get("client_config") or {}
+            timeout = config.get("timeout", 30.0)
+            http2 = config.get("http2", False)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.get("max_connections", 100),
+                    max_keepalive_connections=config.get("max_keepalive", 20),
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+                # Model servers are plain HTTP, so HTTP/2 means prior-knowledge h2c
+                http1=not http2,
+                http2=http2
+            )
+            self.clients[deployment_id] = client
+            self._loop = asyncio.get_running_loop()
+        return client
+    
+    def _retire_client(self, client: httpx.AsyncClient):
+        """Close a pooled client from sync code without blocking the caller"""
+        if self._loop is not None and not self._loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), self._loop)
+    
+    def _generate_sklearn_app(self) -> str:
         """Generate FastAPI app code for sklearn models"""
         return f'''
+{MODEL_SERVER_PRELUDE}import os
 import pickle
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from typing import List
 import uvicorn
 
-app = FastAPI(title="Model API - {model.name}")
+app = FastAPI(title=f"Model API - {{os.getenv('MODEL_NAME', 'model')}}")
 
-# Load model
+def run_inference(features):
+    return model.predict(features)
+{MODEL_SERVER_RUNTIME}
+# Load model, memory-mapping its arrays from the shared conversion cache
 try:
-    with open("/model/model.pkl", "rb") as f:
-        model = pickle.load(f)
+    model = load_artifact("/model/model.pkl", os.path.basename(os.getenv("MODEL_PATH") or "model.pkl"))
 except Exception as e:
     print(f"Error loading model: {{e}}")
     model = None
 
-class PredictionRequest(BaseModel):
-    features: list
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
 
-class PredictionResponse(BaseModel):
-    prediction: list
+class BatchPredictionResponse(BaseModel):
+    predictions: list
+    errors: list
 
 @app.get("/health")
 def health_check():
     return {{"status": "healthy", "model_loaded": model is not None}}
 
-@app.post("/predict", response_model=PredictionResponse)
-def predict(request: PredictionRequest):
+@app.post("/predict")
+async def predict(request: Request):
     if model is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    features = await read_features(request)
     try:
-        features = np.array(request.features).reshape(1, -1)
-        prediction = model.predict(features)
-        return PredictionResponse(prediction=prediction.tolist())
+        prediction = await infer(features)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {{str(e)}}")
+    return render_prediction(request, prediction)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not request.instances:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    
+    predictions, errors = await infer_rows(request.instances)
+    return json_response({{"predictions": predictions, "errors": errors}})
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return DuplexStreamingResponse(
+        stream_predictions(request.stream(), request.headers.get("content-type")),
+        media_type="application/x-ndjson"
+    )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serve(app)
 '''
     
-    def _generate_pytorch_app(self, model: Model) -> str:
+    def _generate_pytorch_app(self) -> str:
         """Generate FastAPI app code for PyTorch models"""
         return f'''
+{MODEL_SERVER_PRELUDE}import os
 import torch
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from typing import List
 import uvicorn
 
-app = FastAPI(title="PyTorch Model API - {model.name}")
+app = FastAPI(title=f"PyTorch Model API - {{os.getenv('MODEL_NAME', 'model')}}")
 
 # Load model
+torch.set_num_threads(CPU_THREADS)
+
 try:
     model = torch.load("/model/model.pt", map_location="cpu")
     model.eval()
@@ -201,43 +1355,71 @@ except Exception as e:
     print(f"Error loading model: {{e}}")
     model = None
 
-class PredictionRequest(BaseModel):
-    features: list
+def run_inference(features):
+    with torch.no_grad():
+        return model(torch.from_numpy(features.astype(np.float32, copy=False))).numpy()
+{MODEL_SERVER_RUNTIME}
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
 
-class PredictionResponse(BaseModel):
-    prediction: list
+class BatchPredictionResponse(BaseModel):
+    predictions: list
+    errors: list
 
 @app.get("/health")
 def health_check():
     return {{"status": "healthy", "model_loaded": model is not None}}
 
-@app.post("/predict", response_model=PredictionResponse)
-def predict(request: PredictionRequest):
+@app.post("/predict")
+async def predict(request: Request):
     if model is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    features = await read_features(request)
     try:
-        features = torch.tensor(request.features, dtype=torch.float32)
-        with torch.no_grad():
-            prediction = model(features)
-        return PredictionResponse(prediction=prediction.tolist())
+        prediction = await infer(features)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {{str(e)}}")
+    return render_prediction(request, prediction)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not request.instances:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    
+    predictions, errors = await infer_rows(request.instances)
+    return json_response({{"predictions": predictions, "errors": errors}})
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return DuplexStreamingResponse(
+        stream_predictions(request.stream(), request.headers.get("content-type")),
+        media_type="application/x-ndjson"
+    )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serve(app)
 '''
     
-    def _generate_tensorflow_app(self, model: Model) -> str:
+    def _generate_tensorflow_app(self) -> str:
         """Generate FastAPI app code for TensorFlow models"""
         return f'''
+{MODEL_SERVER_PRELUDE}import os
 import tensorflow as tf
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from typing import List
 import uvicorn
 
-app = FastAPI(title="TensorFlow Model API - {model.name}")
+app = FastAPI(title=f"TensorFlow Model API - {{os.getenv('MODEL_NAME', 'model')}}")
 
 # Load model
 try:
@@ -246,30 +1428,323 @@ except Exception as e:
     print(f"Error loading model: {{e}}")
     model = None
 
-class PredictionRequest(BaseModel):
-    features: list
+def run_inference(features):
+    return model.predict(features, verbose=0)
+{MODEL_SERVER_RUNTIME}
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
 
-class PredictionResponse(BaseModel):
-    prediction: list
+class BatchPredictionResponse(BaseModel):
+    predictions: list
+    errors: list
 
 @app.get("/health")
 def health_check():
     return {{"status": "healthy", "model_loaded": model is not None}}
 
-@app.post("/predict", response_model=PredictionResponse)
-def predict(request: PredictionRequest):
+@app.post("/predict")
+async def predict(request: Request):
     if model is None:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
+    features = await read_features(request)
     try:
-        features = np.array(request.features).reshape(1, -1)
-        prediction = model.predict(features)
-        return PredictionResponse(prediction=prediction.tolist())
+        prediction = await infer(features)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Prediction error: {{str(e)}}")
+    return render_prediction(request, prediction)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not request.instances:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    
+    predictions, errors = await infer_rows(request.instances)
+    return json_response({{"predictions": predictions, "errors": errors}})
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return DuplexStreamingResponse(
+        stream_predictions(request.stream(), request.headers.get("content-type")),
+        media_type="application/x-ndjson"
+    )
+
+if __name__ == "__main__":
+    # The TensorFlow runtime is not fork-safe once a model is loaded
+    serve(app, fork_safe=False)
+'''
+    
+    def _generate_onnx_app(self) -> str:
+        """Generate FastAPI app code for ONNX models served by ONNX Runtime"""
+        return f'''
+{MODEL_SERVER_PRELUDE}import os
+import numpy as np
+import onnxruntime as ort
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel
+from typing import List
+import uvicorn
+
+app = FastAPI(title=f"ONNX Model API - {{os.getenv('MODEL_NAME', 'model')}}")
+
+INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", str(CPU_THREADS)))
+INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+
+ONNX_DTYPES = {{
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(float16)": np.float16,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(bool)": np.bool_,
+}}
+
+model = None
+
+def load_session():
+    global model, input_specs, output_name, fixed_batch
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = INTRA_OP_THREADS
+    options.inter_op_num_threads = INTER_OP_THREADS
+    providers = [
+        provider for provider in ("CUDAExecutionProvider", "CPUExecutionProvider")
+        if provider in ort.get_available_providers()
+    ]
+    session = ort.InferenceSession("/model/model.onnx", sess_options=options, providers=providers)
+    input_specs = [(i.name, i.shape, ONNX_DTYPES.get(i.type, np.float32)) for i in session.get_inputs()]
+    output_name = session.get_outputs()[0].name
+    # Models exported with a fixed batch size need inputs fed in slices of that size
+    fixed_batch = input_specs[0][1][0] if input_specs[0][1] and isinstance(input_specs[0][1][0], int) else None
+    model = session
+
+# Sessions own thread pools that don't survive fork, so each worker builds its own
+@app.on_event("startup")
+def load_model():
+    try:
+        load_session()
+    except Exception as e:
+        print(f"Error loading model: {{e}}")
+
+def _shape_input(features, shape, dtype):
+    features = np.ascontiguousarray(features, dtype=dtype)
+    dims = shape[1:]
+    if features.ndim == 2 and len(dims) > 1 and all(isinstance(d, int) for d in dims):
+        features = features.reshape((len(features), *dims))
+    return features
+
+def _feeds(features):
+    if len(input_specs) == 1:
+        name, shape, dtype = input_specs[0]
+        return {{name: _shape_input(features, shape, dtype)}}
+    # With several inputs the feature vector is their concatenation, in graph order
+    feeds = {{}}
+    offset = 0
+    for name, shape, dtype in input_specs:
+        width = int(np.prod(shape[1:]))
+        feeds[name] = _shape_input(features[:, offset:offset + width], shape, dtype)
+        offset += width
+    return feeds
+
+def run_inference(features):
+    if not fixed_batch or len(features) == fixed_batch:
+        return model.run([output_name], _feeds(features))[0]
+    features = np.asarray(features)
+    outputs = []
+    for start in range(0, len(features), fixed_batch):
+        chunk = features[start:start + fixed_batch]
+        if len(chunk) < fixed_batch:
+            # Zero rows fill out the last slice; their outputs are trimmed below
+            padding = np.zeros((fixed_batch - len(chunk), *chunk.shape[1:]), dtype=chunk.dtype)
+            chunk = np.concatenate([chunk, padding])
+        outputs.append(model.run([output_name], _feeds(chunk))[0])
+    return np.concatenate(outputs)[:len(features)]
+{MODEL_SERVER_RUNTIME}
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
+
+class BatchPredictionResponse(BaseModel):
+    predictions: list
+    errors: list
+
+@app.get("/health")
+def health_check():
+    return {{"status": "healthy", "model_loaded": model is not None}}
+
+@app.get("/metadata")
+def metadata():
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    return {{
+        "inputs": [{{"name": i.name, "shape": i.shape, "type": i.type}} for i in model.get_inputs()],
+        "outputs": [{{"name": o.name, "shape": o.shape, "type": o.type}} for o in model.get_outputs()],
+        "providers": model.get_providers()
+    }}
+
+@app.post("/predict")
+async def predict(request: Request):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    features = await read_features(request)
+    try:
+        prediction = await infer(features)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Prediction error: {{str(e)}}")
+    return render_prediction(request, prediction)
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    if not request.instances:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    
+    predictions, errors = await infer_rows(request.instances)
+    return json_response({{"predictions": predictions, "errors": errors}})
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    if model is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    return DuplexStreamingResponse(
+        stream_predictions(request.stream(), request.headers.get("content-type")),
+        media_type="application/x-ndjson"
+    )
+
+if __name__ == "__main__":
+    serve(app)
+'''
+    
+    def _generate_multi_model_app(self) -> str:
+        """Generate FastAPI app code for the shared multi-model sklearn server"""
+        return f'''
+{MODEL_SERVER_PRELUDE}import asyncio
+import os
+import pickle
+from collections import OrderedDict
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Header
+from pydantic import BaseModel
+from typing import List
+import uvicorn
+
+app = FastAPI(title="Multi-Model API")
+
+MODEL_ROOT = "/models"
+MEMORY_BUDGET_BYTES = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "2048")) * 1024 * 1024
+
+def run_inference(features):
+    raise RuntimeError("The multi-model server has no default model")
+{MODEL_SERVER_RUNTIME}
+class ModelRegistry:
+    """Models resident in this server, evicted least recently used beyond a memory budget"""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.size_bytes = 0
+        self._models = OrderedDict()  # key -> (file signature, model, size)
+        self._locks = {{}}
+
+    async def get(self, key, model_file):
+        if not model_file or os.path.basename(model_file) != model_file:
+            raise HTTPException(status_code=400, detail="Invalid X-Model-File")
+        path = os.path.join(MODEL_ROOT, model_file)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Model file not found")
+        # A re-uploaded model file gets a new signature and is reloaded
+        signature = (model_file, stat.st_mtime_ns, stat.st_size)
+
+        entry = self._models.get(key)
+        if entry is not None and entry[0] == signature:
+            self._models.move_to_end(key)
+            return entry[1]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+            model = await run_in_threadpool(load_artifact, path)
+            self.unload(key)
+            # On-disk size approximates the resident size of NumPy-backed models
+            self._models[key] = (signature, model, stat.st_size)
+            self.size_bytes += stat.st_size
+            while self.size_bytes > self.budget_bytes and len(self._models) > 1:
+                self.unload(next(iter(self._models)))
+            return model
+
+    def unload(self, key):
+        entry = self._models.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[2]
+
+    def describe(self):
+        return [{{"key": key, "file": entry[0][0], "size_bytes": entry[2]}} for key, entry in self._models.items()]
+
+registry = ModelRegistry(MEMORY_BUDGET_BYTES)
+
+class BatchPredictionRequest(BaseModel):
+    instances: List[List[float]]
+
+class BatchPredictionResponse(BaseModel):
+    predictions: list
+    errors: list
+
+@app.get("/health")
+def health_check():
+    return {{"status": "healthy", "resident_models": len(registry._models), "resident_bytes": registry.size_bytes}}
+
+@app.get("/models")
+def list_models():
+    return {{"models": registry.describe(), "budget_bytes": registry.budget_bytes}}
+
+@app.post("/models/{{key}}/load")
+async def load_model(key: str, x_model_file: str = Header(None)):
+    await registry.get(key, x_model_file)
+    return {{"status": "loaded"}}
+
+@app.delete("/models/{{key}}")
+def unload_model(key: str):
+    registry.unload(key)
+    return {{"status": "unloaded"}}
+
+@app.post("/models/{{key}}/predict")
+async def predict(key: str, request: Request, x_model_file: str = Header(None)):
+    model = await registry.get(key, x_model_file)
+    features = await read_features(request)
+    try:
+        prediction = await run_before_deadline(model.predict, features)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Prediction error: {{str(e)}}")
+    return render_prediction(request, prediction)
+
+@app.post("/models/{{key}}/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(key: str, request: BatchPredictionRequest, x_model_file: str = Header(None)):
+    model = await registry.get(key, x_model_file)
+    if not request.instances:
+        raise HTTPException(status_code=400, detail="No instances provided")
+    
+    predictions, errors = await infer_rows(request.instances, model.predict)
+    return json_response({{"predictions": predictions, "errors": errors}})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    serve(app)
 '''
     
     def _generate_dockerfile(self, base_image: str, model_type: str) -> str:
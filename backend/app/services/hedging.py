@@ -0,0 +1,67 @@
+import os
+from collections import deque
+from typing import Iterable, Optional
+
+# Recent successful predict latencies each replica's p95 is taken from
+HEDGE_LATENCY_SAMPLES = int(os.getenv("HEDGE_LATENCY_SAMPLES", "500"))
+# Samples a replica needs before its latency sets the hedge delay
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# Floor on the hedge delay, so very fast deployments aren't hedged on noise
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "5"))
+# Most hedges sent per request on average, so a slow deployment can't have its load doubled
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+# Hedges that may be sent back to back after a quiet period
+HEDGE_BURST = float(os.getenv("HEDGE_BURST", "10"))
+
+# The p95 is recomputed after this many new samples rather than on every request
+REFRESH_EVERY = 50
+
+# Cancellation message for a call that a hedge beat to the answer
+HEDGE_LOST = "hedge lost"
+
+class LatencyWindow:
+    """Recent successful call latencies of one replica and their p95"""
+
+    __slots__ = ("samples", "since_refresh", "p95")
+
+    def __init__(self):
+        self.samples: deque = deque(maxlen=HEDGE_LATENCY_SAMPLES)
+        self.since_refresh = 0
+        self.p95: Optional[float] = None
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.since_refresh += 1
+        if self.since_refresh >= REFRESH_EVERY or (self.p95 is None and len(self.samples) >= HEDGE_MIN_SAMPLES):
+            self.since_refresh = 0
+            ordered = sorted(self.samples)
+            self.p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+
+class HedgePolicy:
+    """When to send a backup request for one deployment.
+
+    A request still unanswered after the p95 latency of the deployment's
+    fastest healthy replica is duplicated to a second replica. Taking the
+    fastest rather than a pooled p95 keeps one slow replica from pushing the
+    delay up to its own latency, which is when hedging matters most. Hedges
+    are paid for from a token budget refilled by HEDGE_MAX_RATIO per request,
+    which caps the extra load.
+    """
+
+    __slots__ = ("tokens",)
+
+    def __init__(self):
+        self.tokens = HEDGE_BURST
+
+    def hedge_delay(self, windows: Iterable[LatencyWindow]) -> Optional[float]:
+        """Seconds to wait before hedging this request, or None if it can't be hedged"""
+        self.tokens = min(self.tokens + HEDGE_MAX_RATIO, HEDGE_BURST)
+        if self.tokens < 1:
+            return None
+        p95s = [window.p95 for window in windows if window.p95 is not None]
+        if not p95s:
+            return None
+        return max(min(p95s), HEDGE_MIN_DELAY_MS / 1000.0)
+
+    def spend(self):
+        self.tokens -= 1
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set
+
+import docker
+
+from app.redis_client import get_redis
+
+IMAGE_REPOSITORY = os.getenv("IMAGE_CACHE_REPOSITORY", "cloudburst-server")
+IMAGE_CACHE_MAX_IMAGES = int(os.getenv("IMAGE_CACHE_MAX_IMAGES", "20"))
+IMAGE_BUILD_TIMEOUT = int(os.getenv("IMAGE_BUILD_TIMEOUT", "1800"))
+
+# Docker label carrying the content key an image was built for
+IMAGE_KEY_LABEL = "cloudburst.image_key"
+
+# Redis sorted set of image tag -> last time a deployment used it
+LAST_USED_KEY = "image-cache:last-used"
+
+def image_key(base_image: str, model_type: str, requirements: List[str], build_files: Dict[str, str]) -> str:
+    """Content address of a model server image"""
+    fingerprint = {
+        "base_image": base_image,
+        "model_type": model_type,
+        "requirements": sorted({r.strip() for r in requirements if r.strip()}),
+        # Generated app code and Dockerfile stand in for the server template version
+        "files": {name: hashlib.sha256(content.encode()).hexdigest() for name, content in sorted(build_files.items())}
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+class ImageCache:
+    """Content-addressed cache of model server images shared by all deployments.
+
+    Images are keyed on the base image, model type, sorted requirements and the
+    generated server files, so deployments of the same kind of model reuse one
+    image and only the model file (mounted at runtime) differs. Unused images
+    are evicted least recently used first.
+    """
+
+    def __init__(self, client: docker.DockerClient):
+        self.client = client
+
+    def get_or_build(self, base_image: str, model_type: str, requirements: List[str], build_files: Dict[str, str]) -> str:
+        """Return the tag of an image for this configuration, building it on a miss"""
+        key = image_key(base_image, model_type, requirements, build_files)
+        tag = f"{IMAGE_REPOSITORY}:{key[:24]}"
+
+        if not self._exists(tag):
+            # Only one worker builds a given image; the others wait and reuse it
+            with get_redis().lock(f"image-cache:build:{key}", timeout=IMAGE_BUILD_TIMEOUT, blocking_timeout=IMAGE_BUILD_TIMEOUT):
+                if not self._exists(tag):
+                    self._build(tag, key, requirements, build_files)
+
+        self._touch(tag)
+        self.evict()
+        return tag
+
+    def evict(self):
+        """Remove least recently used images beyond the cap that no container uses"""
+        images = self.client.images.list(filters={"label": IMAGE_KEY_LABEL})
+        if len(images) <= IMAGE_CACHE_MAX_IMAGES:
+            return
+
+        redis = get_redis()
+        in_use = self._images_in_use()
+
+        def last_used(image) -> float:
+            scores = [redis.zscore(LAST_USED_KEY, tag) or 0 for tag in image.tags]
+            return max(scores, default=0)
+
+        excess = len(images) - IMAGE_CACHE_MAX_IMAGES
+        for image in sorted(images, key=last_used):
+            if excess <= 0:
+                break
+            if image.id in in_use:
+                continue
+            try:
+                self.client.images.remove(image.id)
+            except docker.errors.APIError as e:
+                print(f"Failed to evict image {image.id}: {e}")
+                continue
+            for tag in image.tags:
+                redis.zrem(LAST_USED_KEY, tag)
+            excess -= 1
+
+    def _exists(self, tag: str) -> bool:
+        try:
+            self.client.images.get(tag)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+
+    def _build(self, tag: str, key: str, requirements: List[str], build_files: Dict[str, str]):
+        with tempfile.TemporaryDirectory(prefix="cloudburst-image-") as build_dir:
+            for name, content in build_files.items():
+                (Path(build_dir) / name).write_text(content)
+            (Path(build_dir) / "requirements.txt").write_text("\n".join(sorted(requirements)))
+
+            # Layer caching stays on, so images sharing a base and requirements reuse the pip layer
+            self.client.images.build(
+                path=build_dir,
+                tag=tag,
+                labels={IMAGE_KEY_LABEL: key},
+                rm=True
+            )
+
+    def _touch(self, tag: str):
+        get_redis().zadd(LAST_USED_KEY, {tag: time.time()})
+
+    def _images_in_use(self) -> Set[str]:
+        """Image IDs referenced by any container, running or not"""
+        return {container.attrs["Image"] for container in self.client.containers.list(all=True)}
@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.metrics import PREDICTION_CACHE_BYTES, PREDICTION_CACHE_ENTRIES, PREDICTION_CACHE_REQUESTS
+from app.redis_client import get_async_redis
+from app.services.deployment_cache import CachedDeployment
+
+def canonical_hash(body: Any) -> str:
+    """Hash a JSON body so that key order and whitespace don't matter"""
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class MemoryStore:
+    """Per-deployment LRU store with a TTL and entry/byte caps"""
+    
+    def __init__(self, deployment_id: int, max_entries: int, max_bytes: int):
+        self.deployment_id = str(deployment_id)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires_at = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: Any, ttl_seconds: float):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+        self.size_bytes += size
+        while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+        PREDICTION_CACHE_ENTRIES.labels(self.deployment_id).set(len(self._entries))
+        PREDICTION_CACHE_BYTES.labels(self.deployment_id).set(self.size_bytes)
+    
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self.size_bytes -= size
+
+class PredictionCache:
+    """Opt-in per-deployment cache of prediction results.
+    
+    Keys combine the deployment, the model version and a canonical hash of the
+    request body. Identical requests that arrive while one is already being
+    computed wait on that single upstream call instead of issuing their own.
+    """
+    
+    def __init__(self):
+        self._stores: Dict[int, MemoryStore] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    async def get_or_compute(self, deployment: CachedDeployment, body: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        if not deployment.cache_enabled:
+            return await compute()
+        
+        key = f"prediction:{deployment.id}:{deployment.model_id}:{deployment.model_version}:{canonical_hash(body)}"
+        
+        cached = await self._get(deployment, key)
+        if cached is not None:
+            PREDICTION_CACHE_REQUESTS.labels(str(deployment.id), "hit").inc()
+            return cached
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            PREDICTION_CACHE_REQUESTS.labels(str(deployment.id), "coalesced").inc()
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The leading request was abandoned, so compute our own result
+                return await compute()
+        
+        PREDICTION_CACHE_REQUESTS.labels(str(deployment.id), "miss").inc()
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so an unawaited failure isn't logged
+            raise
+        else:
+            future.set_result(result)
+            await self._set(deployment, key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+    
+    def drop(self, deployment_id: int):
+        """Forget the in-process entries for a deployment"""
+        self._stores.pop(deployment_id, None)
+        PREDICTION_CACHE_ENTRIES.labels(str(deployment_id)).set(0)
+        PREDICTION_CACHE_BYTES.labels(str(deployment_id)).set(0)
+    
+    def _store_for(self, deployment: CachedDeployment) -> MemoryStore:
+        store = self._stores.get(deployment.id)
+        if store is None or (store.max_entries, store.max_bytes) != (deployment.cache_max_entries, deployment.cache_max_bytes):
+            store = MemoryStore(deployment.id, deployment.cache_max_entries, deployment.cache_max_bytes)
+            self._stores[deployment.id] = store
+        return store
+    
+    async def _get(self, deployment: CachedDeployment, key: str) -> Optional[Any]:
+        if deployment.cache_backend == "redis":
+            try:
+                value = await get_async_redis().get(key)
+            except Exception as e:
+                print(f"Prediction cache read failed: {e}")
+                return None
+            return json.loads(value) if value is not None else None
+        return self._store_for(deployment).get(key)
+    
+    async def _set(self, deployment: CachedDeployment, key: str, value: Any):
+        if deployment.cache_backend == "redis":
+            try:
+                await get_async_redis().set(key, json.dumps(value), ex=int(deployment.cache_ttl_seconds))
+            except Exception as e:
+                print(f"Prediction cache write failed: {e}")
+            return
+        self._store_for(deployment).set(key, value, deployment.cache_ttl_seconds)
@@ -0,0 +1,175 @@
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.redis_client import get_async_redis
+from app.services.deployment_cache import CachedDeployment
+
+# Requests per minute per API key, by the deployment owner's pricing tier
+TIER_LIMITS = {
+    "free": int(os.getenv("RATE_LIMIT_PER_MINUTE", "60")),
+    "pro": int(os.getenv("RATE_LIMIT_PRO_PER_MINUTE", "600")),
+    "enterprise": int(os.getenv("RATE_LIMIT_ENTERPRISE_PER_MINUTE", "6000")),
+}
+
+# Refill the bucket and take `cost` tokens if there are enough. Uses the Redis
+# clock so gateways with skewed clocks agree; floats are returned as strings
+# because Lua numbers are truncated to integers on the way out.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+
+local allowed = 0
+local wait_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait_ms = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(tokens), wait_ms, math.ceil((capacity - tokens) / rate * 1000)}
+"""
+
+# Cap on buckets remembered as empty by the local pre-check
+MAX_BLOCKED_BUCKETS = 10000
+
+# After a Redis error, requests skip rate limiting for this long instead of each waiting out a timeout
+RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_BACKOFF_SECONDS", "5"))
+
+def tier_limit(pricing_tier: Optional[str]) -> int:
+    return TIER_LIMITS.get(pricing_tier or "free", TIER_LIMITS["free"])
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: int
+    retry_after: int
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset_seconds)
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+class RateLimiter:
+    """Token buckets per API key and deployment, shared by all gateways through Redis.
+
+    A bucket holds a minute's worth of the tier's requests and refills continuously.
+    Once Redis reports a bucket empty, this process denies further requests for it
+    locally until enough time has passed to refill a token, saving the round trip.
+    If Redis fails, requests are let through unchecked for a short backoff window.
+    """
+
+    def __init__(self):
+        self._script = None
+        # bucket -> (monotonic time a token is available, monotonic time it is full)
+        self._blocked: Dict[str, Tuple[float, float]] = {}
+        # Monotonic time until which Redis is assumed to be down
+        self._unavailable_until = 0.0
+
+    async def acquire(self, deployment: CachedDeployment, cost: int = 1) -> Optional[RateLimitDecision]:
+        """Take tokens for a request; returns None when rate limiting is unavailable"""
+        limit = tier_limit(deployment.pricing_tier)
+        bucket = f"ratelimit:{deployment.id}:{deployment.api_key_hash[:16]}"
+        now = time.monotonic()
+        if now < self._unavailable_until:
+            return None
+
+        blocked = self._blocked.get(bucket)
+        if blocked is not None:
+            available_at, full_at = blocked
+            if now < available_at:
+                # Tokens only come back with time, so the answer from Redis would be the same
+                return RateLimitDecision(
+                    allowed=False,
+                    limit=limit,
+                    remaining=0,
+                    reset_seconds=math.ceil(full_at - now),
+                    retry_after=max(math.ceil(available_at - now), 1)
+                )
+            del self._blocked[bucket]
+
+        try:
+            if self._script is None:
+                self._script = get_async_redis().register_script(TOKEN_BUCKET_LUA)
+            allowed, tokens, wait_ms, reset_ms = await self._script(keys=[bucket], args=[limit, limit / 60.0, cost])
+        except Exception as e:
+            # Fail open: a Redis outage shouldn't take every endpoint down with it
+            failed_at = time.monotonic()
+            if failed_at >= self._unavailable_until:
+                # Requests already waiting on Redis fail together; log the outage once
+                print(f"Rate limiter unavailable, skipping it for {RATE_LIMIT_BACKOFF_SECONDS:g}s: {e}")
+            self._unavailable_until = failed_at + RATE_LIMIT_BACKOFF_SECONDS
+            return None
+
+        if not allowed:
+            if len(self._blocked) >= MAX_BLOCKED_BUCKETS:
+                self._prune(now)
+            self._blocked[bucket] = (now + wait_ms / 1000.0, now + reset_ms / 1000.0)
+
+        return RateLimitDecision(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=int(float(tokens)),
+            reset_seconds=math.ceil(reset_ms / 1000.0),
+            retry_after=max(math.ceil(wait_ms / 1000.0), 1)
+        )
+
+    def _prune(self, now: float):
+        for bucket in [b for b, (available_at, _) in self._blocked.items() if available_at <= now]:
+            del self._blocked[bucket]
+        while len(self._blocked) >= MAX_BLOCKED_BUCKETS:
+            self._blocked.pop(next(iter(self._blocked)))
+
+class RateLimitHeadersMiddleware:
+    """Adds the quota headers of a rate-limited request to whatever response it ends with.
+
+    Routes record their decision in `request.state.rate_limit`, so error responses
+    raised after the check carry the headers too.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                decision = scope.get("state", {}).get("rate_limit")
+                if decision is not None:
+                    existing = {name.lower() for name, _ in message.get("headers", [])}
+                    extra = [
+                        (name.lower().encode(), value.encode())
+                        for name, value in decision.headers().items()
+                        if name.lower().encode() not in existing
+                    ]
+                    message["headers"] = list(message.get("headers", [])) + extra
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
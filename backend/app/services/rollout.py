@@ -0,0 +1,192 @@
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Set
+
+from app.metrics import ROLLOUT_REQUESTS, ROLLOUT_SHADOW_DROPPED
+from app.redis_client import get_async_redis, get_redis
+from app.services.deployment_cache import CachedDeployment
+
+ROLLOUT_MODES = ("canary", "shadow")
+
+# Recent latencies kept per arm for the comparison report
+ROLLOUT_LATENCY_SAMPLES = int(os.getenv("ROLLOUT_LATENCY_SAMPLES", "1000"))
+# Mirrored requests and stat writes allowed in flight per process; beyond this shadows are skipped
+ROLLOUT_MAX_BACKGROUND = int(os.getenv("ROLLOUT_MAX_BACKGROUND", "256"))
+# Relative tolerance when comparing numeric outputs of the two versions
+ROLLOUT_AGREEMENT_TOLERANCE = float(os.getenv("ROLLOUT_AGREEMENT_TOLERANCE", "1e-6"))
+
+def _stats_key(deployment_id: int) -> str:
+    return f"rollout:{deployment_id}:stats"
+
+def _latency_key(deployment_id: int, arm: str) -> str:
+    return f"rollout:{deployment_id}:latency:{arm}"
+
+def _decode_output(output: Any) -> Any:
+    """Predict results are dicts, or (body, media type) for forwarded requests"""
+    if isinstance(output, tuple):
+        content, media_type = output
+        if media_type.split(";")[0].strip() == "application/json":
+            return json.loads(content)
+        return content
+    return output
+
+def _values_agree(a: Any, b: Any) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=ROLLOUT_AGREEMENT_TOLERANCE, abs_tol=ROLLOUT_AGREEMENT_TOLERANCE)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_values_agree(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_values_agree(x, y) for x, y in zip(a, b))
+    return a == b
+
+def outputs_agree(primary: Any, candidate: Any) -> bool:
+    """Whether two versions gave the same answer, allowing for float noise"""
+    try:
+        return _values_agree(_decode_output(primary), _decode_output(candidate))
+    except ValueError:
+        return False
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class TrafficSplitter:
+    """Splits a deployment's predict traffic with a candidate version.
+
+    In canary mode a `candidate_weight` share of requests is answered by the
+    candidate deployment, falling back to the primary if it fails. In shadow
+    mode the primary answers every request and a `candidate_weight` share is
+    mirrored to the candidate after the response is ready, without waiting for
+    it. Latency, errors and (for shadows) output agreement are kept in Redis so
+    the versions can be compared across all gateways before cutting over.
+    """
+
+    def __init__(self):
+        self._background: Set[asyncio.Task] = set()
+
+    def pick_canary(self, deployment: CachedDeployment) -> bool:
+        """Whether a request should be answered by the deployment's canary"""
+        return (
+            deployment.rollout_mode == "canary"
+            and bool(deployment.candidate_deployment_id)
+            and random.random() < deployment.candidate_weight
+        )
+
+    async def call(self, deployment: CachedDeployment, predict: Callable[[int], Awaitable[Any]], mirror: Optional[Callable[[int], Awaitable[Any]]] = None, canary: Optional[bool] = None) -> Any:
+        """Run predict(target_deployment_id) against the primary or its candidate.
+
+        canary is the arm chosen by pick_canary, for callers that need to know
+        it up front; it is drawn here when not given. Shadows start only once
+        the primary has answered, so they go through mirror, which shouldn't
+        carry the caller's deadline; predict is used when no mirror is given.
+        """
+        candidate_id = deployment.candidate_deployment_id
+        if deployment.rollout_mode not in ROLLOUT_MODES or not candidate_id:
+            return await predict(deployment.id)
+
+        if canary is None:
+            canary = self.pick_canary(deployment)
+        if canary:
+            started = time.perf_counter()
+            try:
+                result = await predict(candidate_id)
+            except Exception as e:
+                self._record(deployment.id, "canary", started, error=True)
+                print(f"Canary deployment {candidate_id} failed, falling back to {deployment.id}: {e}")
+            else:
+                self._record(deployment.id, "canary", started)
+                return result
+
+        started = time.perf_counter()
+        try:
+            result = await predict(deployment.id)
+        except Exception:
+            self._record(deployment.id, "primary", started, error=True)
+            raise
+        self._record(deployment.id, "primary", started)
+
+        if deployment.rollout_mode == "shadow" and random.random() < deployment.candidate_weight:
+            if len(self._background) >= ROLLOUT_MAX_BACKGROUND:
+                ROLLOUT_SHADOW_DROPPED.labels(str(deployment.id)).inc()
+            else:
+                self._spawn(self._mirror(deployment.id, candidate_id, mirror or predict, result))
+        return result
+
+    async def _mirror(self, deployment_id: int, candidate_id: int, predict: Callable[[int], Awaitable[Any]], primary_result: Any):
+        started = time.perf_counter()
+        try:
+            result = await predict(candidate_id)
+        except Exception:
+            await self._write(deployment_id, "shadow", None, error=True)
+            return
+        latency_ms = (time.perf_counter() - started) * 1000
+        await self._write(deployment_id, "shadow", latency_ms, agreed=outputs_agree(primary_result, result))
+
+    def _record(self, deployment_id: int, arm: str, started: float, error: bool = False):
+        """Write stats off the response path"""
+        if len(self._background) < ROLLOUT_MAX_BACKGROUND:
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._spawn(self._write(deployment_id, arm, latency_ms, error))
+
+    async def _write(self, deployment_id: int, arm: str, latency_ms: Optional[float], error: bool = False, agreed: Optional[bool] = None):
+        ROLLOUT_REQUESTS.labels(str(deployment_id), arm, "error" if error else "ok").inc()
+        try:
+            pipe = get_async_redis().pipeline(transaction=False)
+            pipe.hincrby(_stats_key(deployment_id), f"{arm}:requests", 1)
+            if error:
+                pipe.hincrby(_stats_key(deployment_id), f"{arm}:errors", 1)
+            else:
+                pipe.lpush(_latency_key(deployment_id, arm), round(latency_ms, 3))
+                pipe.ltrim(_latency_key(deployment_id, arm), 0, ROLLOUT_LATENCY_SAMPLES - 1)
+            if agreed is not None:
+                pipe.hincrby(_stats_key(deployment_id), "compared", 1)
+                pipe.hincrby(_stats_key(deployment_id), "agreed", int(agreed))
+            await pipe.execute()
+        except Exception as e:
+            print(f"Error recording rollout stats for deployment {deployment_id}: {e}")
+
+    def _spawn(self, coro: Coroutine):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def summary(self, deployment_id: int) -> Dict[str, Any]:
+        """Per-arm request counts, error rates and latency percentiles, plus shadow agreement"""
+        redis = get_redis()
+        stats = {k.decode(): int(v) for k, v in redis.hgetall(_stats_key(deployment_id)).items()}
+
+        arms = {}
+        for arm in ("primary", "canary", "shadow"):
+            requests = stats.get(f"{arm}:requests", 0)
+            if not requests:
+                continue
+            errors = stats.get(f"{arm}:errors", 0)
+            samples = [float(v) for v in redis.lrange(_latency_key(deployment_id, arm), 0, -1)]
+            arms[arm] = {
+                "requests": requests,
+                "errors": errors,
+                "error_rate": errors / requests,
+                "p50_latency_ms": _percentile(samples, 0.5),
+                "p95_latency_ms": _percentile(samples, 0.95)
+            }
+
+        compared = stats.get("compared", 0)
+        return {
+            "arms": arms,
+            "compared": compared,
+            "agreement_rate": stats.get("agreed", 0) / compared if compared else None
+        }
+
+    def reset(self, deployment_id: int):
+        get_redis().delete(
+            _stats_key(deployment_id),
+            *[_latency_key(deployment_id, arm) for arm in ("primary", "canary", "shadow")]
+        )
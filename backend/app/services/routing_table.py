@@ -0,0 +1,108 @@
+import json
+from typing import Any, Callable, Dict, Optional
+
+from app.redis_client import ChannelListener, get_async_redis, get_redis
+
+ROUTE_KEY = "routes:{deployment_id}"
+INDEX_KEY = "routes:index"
+CHANGES_CHANNEL = "routes:changed"
+
+def _route_key(deployment_id: int) -> str:
+    return ROUTE_KEY.format(deployment_id=deployment_id)
+
+def _decode(fields: Dict[bytes, bytes]) -> Optional[Dict[str, Any]]:
+    """Turn a route hash into {"client_config": {...}, "replicas": {container_id: {...}}, "shared": {...}?}"""
+    if not fields:
+        return None
+    route = {"client_config": {}, "replicas": {}}
+    health = {}
+    for field, value in fields.items():
+        field = field.decode()
+        if field == "config":
+            route["client_config"] = json.loads(value)
+        elif field == "shared":
+            route["shared"] = json.loads(value)
+        elif field.startswith("replica:"):
+            route["replicas"][field[len("replica:"):]] = json.loads(value)
+        elif field.startswith("health:"):
+            health[field[len("health:"):]] = value != b"0"
+    for container_id, replica in route["replicas"].items():
+        replica["healthy"] = health.get(container_id, True)
+    return route
+
+class RoutingTable:
+    """Deployment routing table shared by every API worker and Celery worker.
+    
+    Each deployment is a Redis hash holding its upstream client config and one
+    field per replica (host, port, health). Writers publish the deployment id
+    on a channel after every change so readers can drop their local copy.
+    """
+    
+    def put_replica(self, deployment_id: int, container_id: str, host: str, port: int, client_config: Dict[str, Any], healthy: bool = True):
+        redis_client = get_redis()
+        pipe = redis_client.pipeline()
+        pipe.hset(_route_key(deployment_id), mapping={
+            "config": json.dumps(client_config),
+            f"replica:{container_id}": json.dumps({"host": host, "port": port}),
+            f"health:{container_id}": "1" if healthy else "0"
+        })
+        pipe.sadd(INDEX_KEY, deployment_id)
+        pipe.publish(CHANGES_CHANNEL, deployment_id)
+        pipe.execute()
+    
+    def put_shared(self, deployment_id: int, pool_id: int, model_file: str):
+        """Route a deployment to a model hosted by the shared multi-model pool"""
+        redis_client = get_redis()
+        pipe = redis_client.pipeline()
+        pipe.hset(_route_key(deployment_id), "shared", json.dumps({"pool": pool_id, "model_file": model_file}))
+        pipe.sadd(INDEX_KEY, deployment_id)
+        pipe.publish(CHANGES_CHANNEL, deployment_id)
+        pipe.execute()
+    
+    def remove_replica(self, deployment_id: int, container_id: str):
+        redis_client = get_redis()
+        pipe = redis_client.pipeline()
+        pipe.hdel(_route_key(deployment_id), f"replica:{container_id}", f"health:{container_id}")
+        pipe.publish(CHANGES_CHANNEL, deployment_id)
+        pipe.execute()
+    
+    def remove_deployment(self, deployment_id: int):
+        redis_client = get_redis()
+        pipe = redis_client.pipeline()
+        pipe.delete(_route_key(deployment_id))
+        pipe.srem(INDEX_KEY, deployment_id)
+        pipe.publish(CHANGES_CHANNEL, deployment_id)
+        pipe.execute()
+    
+    def get(self, deployment_id: int) -> Optional[Dict[str, Any]]:
+        return _decode(get_redis().hgetall(_route_key(deployment_id)))
+    
+    async def fetch(self, deployment_id: int) -> Optional[Dict[str, Any]]:
+        return _decode(await get_async_redis().hgetall(_route_key(deployment_id)))
+    
+    async def fetch_all(self) -> Dict[int, Dict[str, Any]]:
+        redis_client = get_async_redis()
+        deployment_ids = [int(member) for member in await redis_client.smembers(INDEX_KEY)]
+        pipe = redis_client.pipeline(transaction=False)
+        for deployment_id in deployment_ids:
+            pipe.hgetall(_route_key(deployment_id))
+        routes = {}
+        for deployment_id, fields in zip(deployment_ids, await pipe.execute()):
+            route = _decode(fields)
+            if route is not None:
+                routes[deployment_id] = route
+        return routes
+    
+    async def set_health(self, deployment_id: int, container_id: str, healthy: bool):
+        """Record a replica health change so other workers route around it too"""
+        pipe = get_async_redis().pipeline()
+        pipe.hset(_route_key(deployment_id), f"health:{container_id}", "1" if healthy else "0")
+        pipe.publish(CHANGES_CHANNEL, deployment_id)
+        await pipe.execute()
+    
+    def listener(self, on_change: Callable[[int], None], on_reset: Callable[[], None]) -> ChannelListener:
+        return ChannelListener(
+            CHANGES_CHANNEL,
+            on_message=lambda data: on_change(int(data)),
+            on_reset=on_reset
+        )
@@ -81,9 +81,11 @@ def calculate_usage_costs():
 
 @celery_app.task
 def deploy_model_async(deployment_id: int, model_id: int):
-    """Deploy model asynchronously"""
+    """Deploy model asynchronously, recording each pipeline stage"""
     
     from app.services.deployment_service import DeploymentService
+    from app.services.deployment_cache import publish_invalidation
+    from app.services.deployment_progress import set_stage
     from app.models import Deployment, Model
     
     db = SessionLocal()
@@ -100,27 +102,104 @@ def deploy_model_async(deployment_id: int, model_id: int):
         deployment_info = deployment_service.deploy_model(
             deployment_id=deployment.id,
             model=model,
-            deployment_config=deployment
+            deployment_config=deployment,
+            on_stage=lambda stage, message: set_stage(db, deployment, stage, message)
         )
         
         # Update deployment status
-        deployment.status = "running"
-        db.commit()
+        deployment.replicas = deployment_info["replicas"]
+        set_stage(db, deployment, "ready", f"{deployment_info['replicas']} replica(s) serving")
+        publish_invalidation(deployment.id)
         
         return {"status": "success", "deployment_info": deployment_info}
         
     except Exception as e:
         # Update deployment status to failed
+        db.rollback()
         deployment = db.query(Deployment).filter(Deployment.id == deployment_id).first()
         if deployment:
-            deployment.status = "failed"
-            db.commit()
+            set_stage(db, deployment, "failed", str(e))
+            publish_invalidation(deployment.id)
         
         return {"status": "failed", "error": str(e)}
     
     finally:
         db.close()
 
+@celery_app.task
+def autoscale_deployments():
+    """Resize auto-scaling deployments from recent request rate, concurrency and latency"""
+    
+    from app.services.deployment_service import DeploymentService
+    from app.services.autoscaler import Autoscaler, scaling_lock
+    from app.models import Deployment, ScalingEvent
+    
+    db = SessionLocal()
+    autoscaler = Autoscaler()
+    deployment_service = DeploymentService()
+    
+    try:
+        now = datetime.utcnow()
+        stats = autoscaler.collect_stats(db, now)
+        
+        deployments = db.query(Deployment).filter(
+            Deployment.auto_scaling == True,
+            Deployment.serving_mode != "shared",
+            Deployment.status == "running"
+        ).all()
+        
+        for deployment in deployments:
+            deployment_stats = stats.get(deployment.id)
+            if autoscaler.decide(deployment, deployment_stats, now) is None:
+                continue
+            
+            # A resize can outlast the beat interval; the next run skips the deployment until it's done
+            lock = scaling_lock(deployment.id)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                # A resize that finished while we were collecting stats may have changed the answer
+                db.refresh(deployment)
+                decision = autoscaler.decide(deployment, deployment_stats, now)
+                if decision is None:
+                    continue
+                
+                replicas, reason = decision
+                try:
+                    new_replicas = deployment_service.scale_deployment(deployment.id, {"replicas": replicas})
+                except Exception as e:
+                    print(f"Error scaling deployment {deployment.id}: {e}")
+                    continue
+                
+                deployment_stats = deployment_stats or {}
+                db.add(ScalingEvent(
+                    deployment_id=deployment.id,
+                    timestamp=now,
+                    previous_replicas=deployment.replicas,
+                    new_replicas=new_replicas,
+                    trigger="autoscaler",
+                    reason=reason,
+                    request_rate=deployment_stats.get("request_rate", 0.0),
+                    concurrency=deployment_stats.get("concurrency", 0.0),
+                    p95_latency_ms=deployment_stats.get("p95_latency_ms", 0.0)
+                ))
+                deployment.replicas = new_replicas
+                deployment.last_scaled_at = now
+                db.commit()
+                print(f"Scaled deployment {deployment.id} to {new_replicas} replicas: {reason}")
+            finally:
+                try:
+                    lock.release()
+                except Exception:
+                    # Expired while the resize ran
+                    pass
+    
+    except Exception as e:
+        print(f"Error autoscaling deployments: {e}")
+    
+    finally:
+        db.close()
+
 @celery_app.task
 def process_model_training(model_id: int, training_config: dict):
     """Process model training in background"""
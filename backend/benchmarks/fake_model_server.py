@@ -0,0 +1,84 @@
+"""Stand-in model server for gateway benchmarks.
+
+Speaks the same HTTP API as the generated model servers (/health, /predict,
+/predict/batch) but only sleeps for a configurable latency and returns a
+prediction of a configurable size, so the gateway is what gets measured.
+
+    python -m benchmarks.fake_model_server --port 9100 --latency-ms 5 --payload-size 10
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import uvicorn
+
+def build_app(latency_ms: float, jitter_ms: float, payload_size: int):
+    prediction = json.dumps({"prediction": [0.5] * payload_size}).encode()
+
+    async def read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def respond(send, status: int, payload: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def model_latency():
+        delay = latency_ms + (random.uniform(-jitter_ms, jitter_ms) if jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000.0)
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        path = scope["path"]
+        if path == "/health":
+            await respond(send, 200, b'{"status": "healthy", "model_loaded": true}')
+        elif path == "/predict":
+            await read_body(receive)
+            await model_latency()
+            await respond(send, 200, prediction)
+        elif path == "/predict/batch":
+            rows = len(json.loads(await read_body(receive) or b"{}").get("instances", []))
+            await model_latency()
+            await respond(send, 200, json.dumps({"predictions": [[0.5] * payload_size] * rows, "errors": []}).encode())
+        else:
+            await respond(send, 404, b'{"detail": "Not Found"}')
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated inference time per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- noise added to the latency")
+    parser.add_argument("--payload-size", type=int, default=10, help="Number of values in each prediction")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        build_app(args.latency_ms, args.jitter_ms, args.payload_size),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        access_log=False
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""CPU cost of encoding API responses: FastAPI's default path versus the orjson fast paths.
+
+Runs each response through FastAPI's own serialize_response + JSONResponse
+(what a route returning rows or dicts goes through) and through
+serialize_rows / FastJSONResponse, and reports CPU microseconds per request.
+Results are written as JSON under benchmarks/results/.
+
+    python -m benchmarks.json_encoding --rows 500 --batch-rows 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import Deployment
+from app.responses import FastJSONResponse, serialize_rows
+from app.schemas import BatchPredictionResponse, DeploymentResponse
+from benchmarks.predict_gateway import RESULTS_DIR, git_revision
+
+def make_deployments(count: int) -> List[Deployment]:
+    """Transient ORM rows shaped like a real deployment listing"""
+    now = datetime.utcnow()
+    return [
+        Deployment(
+            id=i, name=f"deployment-{i}", model_id=i, owner_id=1,
+            api_endpoint=f"/api/predict/{i:032x}", api_key=f"ml_{i:032x}",
+            status="running", stage="ready", stage_message=None, replicas=2,
+            instance_type="cpu", serving_mode="dedicated", auto_scaling=True,
+            min_instances=1, max_instances=5, target_concurrency=4.0, target_p95_ms=250.0,
+            pool_max_connections=100, pool_max_keepalive=20, request_timeout_seconds=30.0,
+            max_concurrency=32, max_queue=64, queue_timeout_ms=2000, http2=False,
+            batching_enabled=False, max_batch_size=32, max_batch_wait_ms=5.0, workers=1,
+            cache_enabled=False, cache_backend="memory", cache_ttl_seconds=300,
+            cache_max_entries=10000, cache_max_bytes=64 * 1024 * 1024,
+            rollout_mode=None, candidate_deployment_id=None, candidate_weight=0.0,
+            created_at=now
+        )
+        for i in range(count)
+    ]
+
+def cpu_us_per_call(fn: Callable[[], Any], min_seconds: float) -> float:
+    """Median of five runs of CPU time per call, each run lasting at least min_seconds"""
+    fn()
+    runs = []
+    for _ in range(5):
+        calls = 0
+        started = time.process_time()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.process_time() - started
+            if elapsed >= min_seconds:
+                break
+        runs.append(elapsed / calls * 1e6)
+    return sorted(runs)[len(runs) // 2]
+
+def fastapi_default(response_model: Any, content: Any) -> Callable[[], bytes]:
+    """What FastAPI does with a route's return value when no Response is returned"""
+    field = create_response_field(name="Response", type_=response_model, mode="serialization") if response_model else None
+    loop = asyncio.new_event_loop()
+
+    def encode() -> bytes:
+        value = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return JSONResponse(value).body
+    return encode
+
+def run_cases(args) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    deployments = make_deployments(args.rows)
+    prediction = {"prediction": rng.random(args.payload_size).tolist()}
+    batch = {"predictions": rng.random((args.batch_rows, args.payload_size)).tolist(), "errors": []}
+    array = rng.random((args.batch_rows, args.payload_size))
+
+    cases = [
+        (f"list {args.rows} deployments", fastapi_default(List[DeploymentResponse], deployments),
+         lambda: serialize_rows(List[DeploymentResponse], deployments).body),
+        (f"prediction of {args.payload_size} values", fastapi_default(None, prediction),
+         lambda: FastJSONResponse(prediction).body),
+        (f"batch of {args.batch_rows} predictions", fastapi_default(BatchPredictionResponse, batch),
+         lambda: FastJSONResponse(batch).body),
+        (f"model server NumPy {args.batch_rows}x{args.payload_size}", fastapi_default(None, {"prediction": array.tolist()}),
+         lambda: FastJSONResponse({"prediction": array}).body),
+    ]
+
+    results = []
+    for name, baseline, fast in cases:
+        # Same document either way, up to whitespace
+        assert json.loads(baseline()) == json.loads(fast()), name
+        baseline_us = cpu_us_per_call(baseline, args.min_seconds)
+        fast_us = cpu_us_per_call(fast, args.min_seconds)
+        results.append({
+            "case": name,
+            "fastapi_default_cpu_us": round(baseline_us, 1),
+            "fast_path_cpu_us": round(fast_us, 1),
+            "cpu_us_saved_per_request": round(baseline_us - fast_us, 1),
+            "speedup": round(baseline_us / fast_us, 2) if fast_us else None
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500, help="Rows in the list response")
+    parser.add_argument("--payload-size", type=int, default=10, help="Values per prediction")
+    parser.add_argument("--batch-rows", type=int, default=1000, help="Rows in the batch prediction response")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="CPU time per measurement run")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    results = run_cases(args)
+    revision = git_revision()
+    report = {
+        "benchmark": "json_encoding",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git": revision,
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "results": results
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"json-encoding-{datetime.utcnow():%Y%m%dT%H%M%S}-{(revision['commit'] or 'nogit')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    width = max(len(r["case"]) for r in results)
+    print(f"{'case':<{width}}  {'default us':>11}  {'fast us':>9}  {'saved us':>9}  speedup")
+    for r in results:
+        print(f"{r['case']:<{width}}  {r['fastapi_default_cpu_us']:>11}  {r['fast_path_cpu_us']:>9}  {r['cpu_us_saved_per_request']:>9}  {r['speedup']}x")
+    print(f"saved {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Load test for the predict gateway against a fake model server.
+
+Starts the API (uvicorn app.main:app) on SQLite or a local Postgres, a stand-in
+model server with configurable latency and payload size, and one running
+deployment routed to it. Then drives /api/deployments/{id}/predict and reports
+throughput and latency percentiles. Results are written as JSON under
+benchmarks/results/ so runs can be compared between commits.
+
+Needs a local Redis (routing table, rate limiter), taken from REDIS_URL.
+
+    python -m benchmarks.predict_gateway --mode closed --concurrency 32 --duration 30
+    python -m benchmarks.predict_gateway --mode poisson --rate 500 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args) -> str:
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+def seed_deployment(model_server_port: int) -> Dict[str, Any]:
+    """Create a user, a ready model and a running deployment routed to the fake model server"""
+    # Imported after the environment is set so they pick up DATABASE_URL/REDIS_URL
+    from app.database import SessionLocal, engine
+    from app.models import Base, Deployment, Model, User
+    from app.services.routing_table import RoutingTable
+
+    Base.metadata.create_all(bind=engine)
+    run_id = uuid.uuid4().hex[:12]
+    db = SessionLocal()
+    try:
+        user = User(
+            email=f"bench-{run_id}@example.com",
+            username=f"bench-{run_id}",
+            hashed_password="!",
+            pricing_tier="enterprise"
+        )
+        db.add(user)
+        db.flush()
+        model = Model(name=f"bench-{run_id}", owner_id=user.id, model_type="sklearn", status="ready", version=1)
+        db.add(model)
+        db.flush()
+        deployment = Deployment(
+            name=f"bench-{run_id}",
+            model_id=model.id,
+            owner_id=user.id,
+            api_endpoint=f"/api/predict/{run_id}",
+            api_key=f"ml_bench_{run_id}",
+            status="running",
+            stage="ready",
+            max_concurrency=10000,
+            max_queue=10000
+        )
+        db.add(deployment)
+        db.commit()
+        seeded = {"user_id": user.id, "model_id": model.id, "deployment_id": deployment.id, "api_key": deployment.api_key}
+    finally:
+        db.close()
+
+    RoutingTable().put_replica(
+        seeded["deployment_id"],
+        "bench-replica",
+        "127.0.0.1",
+        model_server_port,
+        {"max_connections": 1000, "max_keepalive": 1000, "timeout": 30.0, "http2": False}
+    )
+    return seeded
+
+def remove_seeded(seeded: Dict[str, Any]):
+    from app.database import SessionLocal
+    from app.models import ApiCall, Deployment, Model, User
+    from app.services.routing_table import RoutingTable
+
+    RoutingTable().remove_deployment(seeded["deployment_id"])
+    db = SessionLocal()
+    try:
+        db.query(ApiCall).filter(ApiCall.deployment_id == seeded["deployment_id"]).delete()
+        db.query(Deployment).filter(Deployment.id == seeded["deployment_id"]).delete()
+        db.query(Model).filter(Model.id == seeded["model_id"]).delete()
+        db.query(User).filter(User.id == seeded["user_id"]).delete()
+        db.commit()
+    finally:
+        db.close()
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(max(math.ceil(q * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+async def run_load(url: str, api_key: str, body: bytes, args) -> Dict[str, Any]:
+    """Drive the endpoint and collect per-request latencies after the warm-up"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    headers = {"X-API-Key": api_key, "Content-Type": "application/json"}
+    connections = args.concurrency if args.mode == "closed" else args.max_connections
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        start = time.perf_counter()
+        measure_from = start + args.warmup
+        stop_at = measure_from + args.duration
+
+        async def send(scheduled: float):
+            try:
+                response = await client.post(url, content=body, headers=headers)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finished = time.perf_counter()
+            if scheduled >= measure_from:
+                # Open-loop latency counts from the intended send time, so a
+                # stalled gateway can't hide queueing delay (coordinated omission)
+                latencies.append((finished - scheduled) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        if args.mode == "closed":
+            async def worker():
+                while time.perf_counter() < stop_at:
+                    await send(time.perf_counter())
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        else:
+            in_flight = set()
+            interval = 1.0 / args.rate
+            scheduled = start
+            while scheduled < stop_at:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(send(scheduled))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                scheduled += random.expovariate(args.rate) if args.mode == "poisson" else interval
+            if in_flight:
+                await asyncio.gather(*in_flight)
+        elapsed = time.perf_counter() - measure_from
+
+    ordered = sorted(latencies)
+    succeeded = statuses.get("200", 0)
+    return {
+        "requests": len(ordered),
+        "succeeded": succeeded,
+        "errors": len(ordered) - succeeded,
+        "status_counts": statuses,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(succeeded / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+            "p50": round(percentile(ordered, 0.50), 3),
+            "p95": round(percentile(ordered, 0.95), 3),
+            "p99": round(percentile(ordered, 0.99), 3),
+            "max": round(ordered[-1], 3) if ordered else 0.0
+        }
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["closed", "constant", "poisson"], default="closed",
+                        help="closed: fixed concurrency; constant/poisson: open-loop arrivals at --rate")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients in closed mode")
+    parser.add_argument("--rate", type=float, default=200.0, help="Requests per second in open-loop modes")
+    parser.add_argument("--max-connections", type=int, default=1000, help="Client connection cap in open-loop modes")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--model-latency-ms", type=float, default=5.0)
+    parser.add_argument("--model-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--payload-size", type=int, default=10, help="Features per request and values per prediction")
+    parser.add_argument("--gateway-workers", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="Defaults to a fresh SQLite file; pass a Postgres URL to test against it")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379"))
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--label", default=None, help="Free-form note stored with the result")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="cloudburst-bench-")
+    database_url = args.database_url or f"sqlite:///{workdir}/bench.db"
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "REDIS_URL": args.redis_url,
+        # The benchmark measures the gateway, not its quotas
+        "RATE_LIMIT_ENTERPRISE_PER_MINUTE": str(10 ** 9),
+        "API_CALL_LOG_BACKEND": "memory"
+    }
+    os.environ.update(env)
+
+    model_server_port = free_port()
+    gateway_port = free_port()
+    processes = []
+    seeded = None
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "benchmarks.fake_model_server",
+            "--port", str(model_server_port),
+            "--latency-ms", str(args.model_latency_ms),
+            "--jitter-ms", str(args.model_jitter_ms),
+            "--payload-size", str(args.payload_size)
+        ], cwd=BACKEND_DIR, env=env))
+        wait_for(f"http://127.0.0.1:{model_server_port}/health")
+
+        seeded = seed_deployment(model_server_port)
+
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(gateway_port),
+            "--workers", str(args.gateway_workers),
+            "--log-level", "warning",
+            "--no-access-log"
+        ], cwd=BACKEND_DIR, env=env))
+        wait_for(f"http://127.0.0.1:{gateway_port}/health")
+
+        url = f"http://127.0.0.1:{gateway_port}/api/deployments/{seeded['deployment_id']}/predict"
+        body = json.dumps({"features": [0.5] * args.payload_size}).encode()
+        results = asyncio.run(run_load(url, seeded["api_key"], body, args))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if seeded is not None:
+            try:
+                remove_seeded(seeded)
+            except Exception as e:
+                print(f"Failed to clean up benchmark deployment: {e}")
+
+    revision = git_revision()
+    report = {
+        "benchmark": "predict_gateway",
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git": revision,
+        "label": args.label,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "database": database_url.split(":", 1)[0]
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "label", "database_url", "redis_url")},
+        "results": results
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{(revision['commit'] or 'nogit')[:10]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    latency = results["latency_ms"]
+    print(f"{args.mode}: {results['requests']} requests, {results['errors']} errors, {results['throughput_rps']} req/s")
+    print(f"latency ms  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"saved {output}")
+
+if __name__ == "__main__":
+    main()
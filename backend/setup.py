@@ -12,6 +12,9 @@ setup(
         "alembic==1.12.1",
         "psycopg2-binary==2.9.9",
         "redis==5.0.1",
+        "httpx[http2]==0.25.2",
+        "orjson==3.9.10",
+        "prometheus-client==0.19.0",
         "celery==5.3.4",
         "pydantic==2.5.0",
         "python-multipart==0.0.6",
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("fastapi")
+pytest.importorskip("docker")
+
+from onnx import TensorProto, helper
+
+from app.services.deployment_service import DeploymentService
+
+
+def _fixed_batch_model(path, batch=4, width=3):
+    weights = helper.make_tensor("W", TensorProto.FLOAT, [width, 1], [1.0] * width)
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["input", "W"], ["output"])],
+        "fixed_batch",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [batch, width])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [batch, 1])],
+        initializer=[weights],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+
+
+def _load_server(model_path):
+    code = DeploymentService._generate_onnx_app(None).replace("/model/model.onnx", str(model_path))
+    namespace = {"__name__": "onnx_server"}
+    exec(compile(code, "onnx_server", "exec"), namespace)
+    namespace["load_session"]()
+    return namespace
+
+
+@pytest.mark.parametrize("rows", [1, 4, 6, 9])
+def test_fixed_batch_model_pads_partial_slices(tmp_path, rows):
+    model_path = tmp_path / "model.onnx"
+    _fixed_batch_model(model_path)
+    server = _load_server(model_path)
+    assert server["fixed_batch"] == 4
+
+    features = np.arange(rows * 3, dtype=np.float32).reshape(rows, 3)
+    predictions = server["run_inference"](features)
+
+    assert predictions.shape == (rows, 1)
+    np.testing.assert_allclose(predictions[:, 0], features.sum(axis=1))